@@ -1,5 +1,5 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord import app_commands
 import aiohttp
 import os
@@ -7,10 +7,17 @@ import asyncio
 import logging
 import io
 from PIL import Image, ImageDraw, ImageFont
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 import itertools  # Adicione esta importação
+import sqlite3
 
 from defi.checks import is_rank_channel_check
+from defi.resilience import request_json, PubgApiError, CircuitOpenError
+from defi.scheduler import get_key_scheduler, DeadlineExceededError, PREFETCH
+from defi.hot_players import HotPlayerTracker, TTLCache
+from defi.admission import AdmissionController, AdmissionRejectedError
+from defi.match_store import get_match_store
+from defi.http_pool import acquire_pubg_session, release_pubg_session, connections_per_host, count_api_keys
 
 # Configurar logger
 logger = logging.getLogger(__name__)
@@ -18,9 +25,48 @@ logger = logging.getLogger(__name__)
 # PUBG API Configs (Ajuste para sua plataforma, se necessário)
 PUBG_API_BASE_URL = "https://api.pubg.com/shards/steam"
 
+# O /versus responde na hora com uma mensagem efêmera de status; o prazo limita só a espera
+# por tokens e por Retry-After, para o usuário não ficar olhando o status para sempre
+INTERACTIVE_DEADLINE_SECONDS = 20
+
+# Admissão do /versus: execuções simultâneas no total e por servidor, tamanho da fila de
+# espera e o teto de partidas aplicado quando todas as vagas estão ocupadas
+VERSUS_GLOBAL_LIMIT = 4
+VERSUS_GUILD_LIMIT = 2
+VERSUS_QUEUE_SIZE = 8
+SATURATED_MAX_MATCHES = 3
+
 # Variáveis de cache globais
 current_season_id_cache = None
-player_id_cache = {}
+
+# Caches quentes do /versus: /players (ID e partidas recentes) por nick e rank por Account ID.
+# Os jogadores mais consultados são renovados em background antes de expirar.
+PLAYER_LOOKUP_TTL = 300
+RANKED_STATS_TTL = 300
+player_lookup_cache = TTLCache(ttl=PLAYER_LOOKUP_TTL)
+ranked_stats_cache = TTLCache(ttl=RANKED_STATS_TTL)
+hot_players = HotPlayerTracker()
+
+# Prefetch: a cada ciclo, no máximo PREFETCH_BUDGET requisições para os HOT_PLAYERS_LIMIT
+# nicks mais consultados, renovando entradas que já passaram da metade do TTL. O orçamento
+# fica bem abaixo da reposição da chave (10/min), e o ciclo só roda se, depois dele, ainda
+# sobrar no bucket o que um /versus frio de 4 jogadores gasta (/players, temporada e 4 ranks)
+PREFETCH_INTERVAL_SECONDS = 60
+PREFETCH_BUDGET = 2
+COLD_VERSUS_TOKENS = 6
+HOT_PLAYERS_LIMIT = 10
+PREFETCH_REFRESH_AGE = 0.5
+
+# /matches não passa pelo escalonador, então os downloads simultâneos de partidas (somando
+# todos os /versus) ficam limitados a metade das conexões por host; a outra metade fica
+# livre para /players, rank e telemetry
+_match_fetch_semaphore: Optional[asyncio.Semaphore] = None
+
+def _get_match_fetch_semaphore() -> asyncio.Semaphore:
+    global _match_fetch_semaphore
+    if _match_fetch_semaphore is None:
+        _match_fetch_semaphore = asyncio.Semaphore(max(1, connections_per_host(count_api_keys()) // 2))
+    return _match_fetch_semaphore
 
 # Nova classe para gerenciar a rotação de chaves da API
 class ApiKeyManager:
@@ -48,165 +94,296 @@ class ApiKeyManager:
 
 
 # Funções de busca da API (agora recebem a chave como argumento)
-async def get_current_season_id(session: aiohttp.ClientSession, headers: dict) -> str | None:
+# "Não encontrado" vira None; falhas da API (instabilidade, rate limit, circuito aberto)
+# sobem como PubgApiError para o comando poder diferenciar os dois casos.
+async def get_current_season_id(session: aiohttp.ClientSession, headers: dict, limiter=None) -> str | None:
     """Busca o ID da temporada atual da API, com cache global."""
     global current_season_id_cache
     if current_season_id_cache:
         return current_season_id_cache
 
     seasons_url = f"{PUBG_API_BASE_URL}/seasons"
-    try:
-        async with session.get(seasons_url, headers=headers) as response:
-            response.raise_for_status()
-            seasons_data = await response.json()
-            current_season = next((s for s in seasons_data.get("data", []) if s.get("attributes", {}).get("isCurrentSeason")), None)
-            if current_season:
-                current_season_id_cache = current_season.get("id")
-                return current_season_id_cache
-    except Exception as e:
-        logger.error(f"Erro ao buscar ID da temporada: {e}")
-        return None
-
-async def get_player_id(session: aiohttp.ClientSession, headers: dict, player_name: str) -> str | None:
-    """Busca o Account ID de um jogador, com cache global."""
-    global player_id_cache
-    if player_name in player_id_cache:
-        return player_id_cache[player_name]
-
-    player_url = f"{PUBG_API_BASE_URL}/players?filter[playerNames]={player_name}"
-    try:
-        async with session.get(player_url, headers=headers) as response:
-            if response.status == 404:
-                return None
-            response.raise_for_status()
-            player_data = await response.json()
-            if not player_data or not player_data.get("data"):
-                return None
-            account_id = player_data["data"][0]["id"]
-            player_id_cache[player_name] = account_id
-            return account_id
-    except Exception as e:
-        logger.error(f"Erro ao buscar Account ID para '{player_name}': {e}")
+    seasons_data = await request_json(session, seasons_url, headers, limiter=limiter)
+    if not seasons_data:
         return None
+    current_season = next((s for s in seasons_data.get("data", []) if s.get("attributes", {}).get("isCurrentSeason")), None)
+    if current_season:
+        current_season_id_cache = current_season.get("id")
+        return current_season_id_cache
+    return None
 
-async def fetch_player_rank_stats(session: aiohttp.ClientSession, pubg_api_key: str, player_name: str) -> Optional[Dict[str, Any]]:
-    """Busca e processa as estatísticas de rank de um jogador."""
-    headers = {
-        "Authorization": f"Bearer {pubg_api_key}",
-        "Accept": "application/vnd.api+json"
-    }
-    account_id = await get_player_id(session, headers, player_name)
-    if not account_id:
+async def fetch_ranked_stats(session: aiohttp.ClientSession, headers: dict, account_id: str, season_id: str, player_name: str, limiter=None, use_cache: bool = True) -> Optional[Dict[str, Any]]:
+    """Busca as estatísticas ranqueadas (squad-fpp) de um Account ID já conhecido."""
+    if use_cache:
+        cached = ranked_stats_cache.get(account_id)
+        if cached:
+            return {**cached, "nickname": player_name}
+    stats_url = f"{PUBG_API_BASE_URL}/players/{account_id}/seasons/{season_id}/ranked"
+    data = await request_json(session, stats_url, headers, limiter=limiter)
+    if not data:
         return None
-    season_id = await get_current_season_id(session, headers)
-    if not season_id:
-        return None
-    try:
-        stats_url = f"{PUBG_API_BASE_URL}/players/{account_id}/seasons/{season_id}/ranked"
-        async with session.get(stats_url, headers=headers) as response:
-            if response.status == 404:
-                return None
-            response.raise_for_status()
-            data = await response.json()
-        ranked_stats = data.get("data", {}).get("attributes", {}).get("rankedGameModeStats", {}).get("squad-fpp")
-        if not ranked_stats:
-            return None
-        tier_info = ranked_stats.get("currentTier", {"tier": "Unranked", "subTier": ""})
-        rank_str = f"{tier_info.get('tier')} {tier_info.get('subTier')}".strip()
-        return {
-            "nickname": player_name,
-            "rank": rank_str,
-            "points": ranked_stats.get("currentRankPoint", 0),
-            "wins": ranked_stats.get("wins", 0),
-            "kda": ranked_stats.get("kda", 0),
-        }
-    except Exception as e:
-        logger.error(f"Erro ao buscar estatísticas de rank para '{player_name}': {e}")
+    ranked_stats = data.get("data", {}).get("attributes", {}).get("rankedGameModeStats", {}).get("squad-fpp")
+    if not ranked_stats:
         return None
-
-async def fetch_player_match_stats(session: aiohttp.ClientSession, pubg_api_key: str, player_name: str, match_count: int) -> Optional[Dict[str, Any]]:
-    """Busca as estatísticas médias das últimas partidas de um jogador."""
-    headers = {
-        "Authorization": f"Bearer {pubg_api_key}",
-        "Accept": "application/vnd.api+json"
+    tier_info = ranked_stats.get("currentTier", {"tier": "Unranked", "subTier": ""})
+    rank_str = f"{tier_info.get('tier')} {tier_info.get('subTier')}".strip()
+    result = {
+        "nickname": player_name,
+        "rank": rank_str,
+        "points": ranked_stats.get("currentRankPoint", 0),
+        "wins": ranked_stats.get("wins", 0),
+        "kda": ranked_stats.get("kda", 0),
     }
-    try:
-        player_url = f"{PUBG_API_BASE_URL}/players?filter[playerNames]={player_name}"
-        async with session.get(player_url, headers=headers) as response:
-            if response.status == 404:
-                return None
-            response.raise_for_status()
-            data = await response.json()
-            if not data.get("data"):
-                return None
-            player_data = data["data"][0]
-            match_ids = [match.get("id") for match in player_data.get("relationships", {}).get("matches", {}).get("data", []) if match.get("id")][:match_count]
-            if not match_ids:
-                return {"nickname": player_name, "avg_damage": 0, "avg_kills": 0, "avg_assists": 0, "num_matches": 0}
-        
-        fetch_tasks = [fetch_match_data(session, pubg_api_key, match_id) for match_id in match_ids]
-        match_data_list = await asyncio.gather(*fetch_tasks)
-        dados_performance = []
-        for match_data in match_data_list:
-            if match_data:
-                stats = extract_player_stats_from_match(match_data, player_name)
-                if stats:
-                    dados_performance.append(stats)
-        if not dados_performance:
-            return {"nickname": player_name, "avg_damage": 0, "avg_kills": 0, "avg_assists": 0, "num_matches": 0}
-            
-        dano_total = sum(d['dano'] for d in dados_performance)
-        kills_total = sum(d['kills'] for d in dados_performance)
-        assists_total = sum(d['assists'] for d in dados_performance)
-        num_partidas = len(dados_performance)
-        
-        return {
-            "nickname": player_name,
-            "avg_damage": dano_total / num_partidas,
-            "avg_kills": kills_total / num_partidas,
-            "avg_assists": assists_total / num_partidas,
-            "num_matches": num_partidas
-        }
-    except Exception as e:
-        logger.error(f"Erro ao buscar estatísticas de partidas para '{player_name}': {e}")
-        return None
+    ranked_stats_cache.set(account_id, result)
+    return result
 
 async def fetch_match_data(session: aiohttp.ClientSession, pubg_api_key: str, match_id: str) -> Optional[Dict[str, Any]]:
-    """Busca dados de uma única partida."""
+    """
+    Busca dados de uma única partida.
+    Uma partida isolada que falhe é ignorada (a média usa as demais), mas um circuito
+    aberto é repassado para o comando falhar rápido.
+    O endpoint /matches não conta no rate limit da API, então não passa pelo escalonador.
+    """
     headers = {
         "Authorization": f"Bearer {pubg_api_key}",
         "Accept": "application/vnd.api+json"
     }
     url = f"{PUBG_API_BASE_URL}/matches/{match_id}"
     try:
-        async with session.get(url, headers=headers) as response:
-            response.raise_for_status()
-            return await response.json()
+        async with _get_match_fetch_semaphore():
+            return await request_json(session, url, headers)
+    except CircuitOpenError:
+        raise
     except Exception as e:
+        # Como antes do request_json: qualquer falha numa partida só a tira da média
         logger.error(f"Erro buscando dados da partida {match_id}: {e}")
         return None
 
-def extract_player_stats_from_match(match_data: Dict[str, Any], nickname: str) -> Optional[Dict[str, float | int]]:
-    """Extrai as estatísticas do jogador dos dados da partida."""
+def extract_players_stats_from_match(match_data: Dict[str, Any], nicknames: List[str]) -> Dict[str, Dict[str, float | int]]:
+    """
+    Extrai, numa única passada pelo 'included', as estatísticas de vários jogadores
+    da mesma partida. As chaves do resultado são os nicks em minúsculas.
+    """
+    wanted = {nickname.lower() for nickname in nicknames}
+    found = {}
     if not match_data or "included" not in match_data:
-        return None
+        return found
     for item in match_data.get("included", []):
         if item.get("type") == "participant":
             stats = item.get("attributes", {}).get("stats", {})
-            if stats.get("name", "").lower() == nickname.lower():
-                return {
+            name = stats.get("name", "").lower()
+            if name in wanted:
+                found[name] = {
                     "dano": stats.get("damageDealt", 0.0),
                     "kills": stats.get("kills", 0),
                     "assists": stats.get("assists", 0),
                 }
-    return None
+                if len(found) == len(wanted):
+                    break
+    return found
+
+async def fetch_players_batch(session: aiohttp.ClientSession, headers: dict, player_names: List[str], limiter=None, use_cache: bool = True, split_missing: bool = True) -> Dict[str, Dict[str, Any]]:
+    """
+    Busca vários jogadores numa única chamada /players (a API aceita até 10 nomes).
+    Retorna {nick em minúsculas: {"id", "name", "match_ids"}} só para os encontrados.
+    Com `use_cache`, nicks ainda quentes no player_lookup_cache não vão à API.
+    Com `split_missing`, um 404 do lote vira uma busca por nick; sem ele, o retorno fica vazio.
+    """
+    players = {}
+    if use_cache:
+        for name in player_names:
+            cached = player_lookup_cache.get(name.lower())
+            if cached:
+                players[name.lower()] = cached
+        player_names = [name for name in player_names if name.lower() not in players]
+        if not player_names:
+            return players
+
+    player_url = f"{PUBG_API_BASE_URL}/players?filter[playerNames]={','.join(player_names)}"
+    data = await request_json(session, player_url, headers, limiter=limiter)
+    if data is None and len(player_names) > 1 and split_missing:
+        # A API responde 404 quando algum nome não existe; separa os válidos individualmente
+        partial = await asyncio.gather(*(fetch_players_batch(session, headers, [name], limiter=limiter, use_cache=False) for name in player_names))
+        players.update({key: value for result in partial for key, value in result.items()})
+        return players
+
+    for player_data in (data or {}).get("data", []):
+        name = player_data.get("attributes", {}).get("name")
+        if not name:
+            continue
+        match_ids = [match.get("id") for match in player_data.get("relationships", {}).get("matches", {}).get("data", []) if match.get("id")]
+        players[name.lower()] = {"id": player_data["id"], "name": name, "match_ids": match_ids}
+        player_lookup_cache.set(name.lower(), players[name.lower()])
+    return players
+
+# Gravações no match store em andamento (referência forte até terminarem)
+_pending_match_writes = set()
+
+async def _store_matches(match_store, match_documents: List[Dict[str, Any]]):
+    try:
+        await match_store.store_matches_async(match_documents)
+    except sqlite3.Error as e:
+        logger.error(f"Erro gravando partidas no match store: {e}")
+
+def _persist_matches(match_store, match_documents: List[Dict[str, Any]]):
+    task = asyncio.create_task(_store_matches(match_store, match_documents))
+    _pending_match_writes.add(task)
+    task.add_done_callback(_pending_match_writes.discard)
+
+async def _gather_or_cancel(*coros):
+    """
+    Como asyncio.gather, mas na primeira exceção cancela as buscas irmãs e espera elas
+    terminarem antes de repassá-la, para nenhuma ficar rodando solta nem terminar com
+    "Task exception was never retrieved". A exceção sobe como veio (sem ExceptionGroup,
+    como no TaskGroup), então o `except PubgApiError` do comando continua valendo.
+    """
+    tasks = [asyncio.ensure_future(coro) for coro in coros]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+async def fetch_squad_stats(session: aiohttp.ClientSession, pubg_api_key: str, player_names: List[str], match_count: int, limiter=None) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    Estatísticas de rank e médias das últimas partidas de vários jogadores de uma vez:
+    uma busca /players para todos, cada partida baixada uma única vez (companheiros de
+    squad dividem a maioria das partidas) e as buscas de rank em paralelo.
+    Partidas já gravadas no match store (por qualquer consulta anterior, de qualquer
+    participante) são lidas do banco em vez de baixadas de novo.
+    Retorna {nome pedido: estatísticas combinadas, ou None se não encontrado}.
+    """
+    headers = {
+        "Authorization": f"Bearer {pubg_api_key}",
+        "Accept": "application/vnd.api+json"
+    }
+    players = await fetch_players_batch(session, headers, player_names, limiter=limiter)
+    season_id = await get_current_season_id(session, headers, limiter=limiter) if players else None
+
+    found_names = [name for name in player_names if name.lower() in players]
+    recent_matches = {name: players[name.lower()]["match_ids"][:match_count] for name in found_names}
+    unique_match_ids = list(dict.fromkeys(match_id for match_ids in recent_matches.values() for match_id in match_ids))
+    account_ids = {name: players[name.lower()]["id"] for name in found_names}
+
+    match_store = get_match_store()
+    try:
+        stored_ids = await match_store.stored_match_ids_async(unique_match_ids)
+    except sqlite3.Error as e:
+        logger.error(f"Erro consultando o match store: {e}")
+        stored_ids = set()
+    missing_match_ids = [match_id for match_id in unique_match_ids if match_id not in stored_ids]
+
+    ranked_tasks = [
+        fetch_ranked_stats(session, headers, players[name.lower()]["id"], season_id, players[name.lower()]["name"], limiter=limiter)
+        for name in found_names
+    ] if season_id else []
+    match_tasks = [fetch_match_data(session, pubg_api_key, match_id) for match_id in missing_match_ids]
+    results = await _gather_or_cancel(*ranked_tasks, *match_tasks)
+    ranked_results = dict(zip(found_names, results[:len(ranked_tasks)]))
+    match_documents = {match_id: data for match_id, data in zip(missing_match_ids, results[len(ranked_tasks):]) if data}
+
+    # {match_id: {account_id: estatísticas}}: do banco para as partidas já vistas...
+    match_stats = {}
+    if stored_ids:
+        try:
+            match_stats = await match_store.participant_stats_async(stored_ids, account_ids.values())
+        except sqlite3.Error as e:
+            logger.error(f"Erro lendo partidas do match store: {e}")
+
+    # ...e uma passada por partida baixada agora, que é gravada inteira para as próximas consultas
+    for match_id, match_data in match_documents.items():
+        extracted = extract_players_stats_from_match(match_data, found_names)
+        match_stats[match_id] = {account_ids[name]: extracted[name.lower()] for name in found_names if name.lower() in extracted}
+    if match_documents:
+        # Gravar não atrasa a resposta: as estatísticas já saíram dos documentos em memória
+        _persist_matches(match_store, list(match_documents.values()))
+
+    dados_performance = {name: [] for name in found_names}
+    for match_id, by_account in match_stats.items():
+        for name in found_names:
+            stats = by_account.get(account_ids[name])
+            if stats and match_id in recent_matches[name]:
+                dados_performance[name].append(stats)
+
+    squad_stats = {}
+    for name in player_names:
+        rank_stats = ranked_results.get(name)
+        if not rank_stats:
+            squad_stats[name] = None
+            continue
+        performance = dados_performance[name]
+        num_partidas = len(performance)
+        squad_stats[name] = {
+            **rank_stats,
+            "avg_damage": sum(d['dano'] for d in performance) / num_partidas if num_partidas else 0,
+            "avg_kills": sum(d['kills'] for d in performance) / num_partidas if num_partidas else 0,
+            "avg_assists": sum(d['assists'] for d in performance) / num_partidas if num_partidas else 0,
+            "num_matches": num_partidas,
+        }
+    return squad_stats
+
+def _needs_refresh(cache: TTLCache, key) -> bool:
+    age = cache.age(key)
+    return age is None or age >= cache.ttl * PREFETCH_REFRESH_AGE
+
+async def prefetch_players(session: aiohttp.ClientSession, pubg_api_key: str, player_names: List[str], limiter=None, budget: int = PREFETCH_BUDGET) -> int:
+    """
+    Renova nos caches quentes o /players (ID e partidas mais recentes) e o rank dos
+    nicks informados, gastando no máximo `budget` requisições. Retorna quantas usou.
+    """
+    headers = {
+        "Authorization": f"Bearer {pubg_api_key}",
+        "Accept": "application/vnd.api+json"
+    }
+    used = 0
+    stale = [name for name in player_names if _needs_refresh(player_lookup_cache, name.lower())][:10]
+    if stale and budget > 0:
+        found = await fetch_players_batch(session, headers, stale, limiter=limiter, use_cache=False, split_missing=False)
+        used += 1
+        if found or len(stale) == 1:
+            missing = [name for name in stale if name.lower() not in found]
+        else:
+            # Um nick que não existe mais (ex.: jogador renomeado) derruba o lote inteiro com 404:
+            # testa um por vez dentro do orçamento, e os próximos ciclos continuam de onde parou
+            missing = []
+            for name in stale:
+                if used >= budget:
+                    break
+                if not await fetch_players_batch(session, headers, [name], limiter=limiter, use_cache=False):
+                    missing.append(name)
+                used += 1
+        # Nick inexistente sai da popularidade para não gastar a cota de novo a cada ciclo
+        for name in missing:
+            hot_players.forget(name)
+
+    season_id = current_season_id_cache
+    if season_id is None and used < budget:
+        season_id = await get_current_season_id(session, headers, limiter=limiter)
+        used += 1
+    if not season_id:
+        return used
+
+    for name in player_names:
+        if used >= budget:
+            break
+        player = player_lookup_cache.get(name.lower())
+        if not player or not _needs_refresh(ranked_stats_cache, player["id"]):
+            continue
+        await fetch_ranked_stats(session, headers, player["id"], season_id, player["name"], limiter=limiter, use_cache=False)
+        used += 1
+    return used
 
 class PUBGCompare(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        if not hasattr(bot, 'http_session') or bot.http_session is None:
-            logger.critical("aiohttp.ClientSession não foi inicializada no bot! PUBGCompare Cog não pode ser carregada corretamente.")
-            raise RuntimeError("aiohttp.ClientSession não inicializada. Verifique a ordem de carregamento ou o main.py.")
+        self.http_session = None
+        self.admission = AdmissionController(
+            global_limit=VERSUS_GLOBAL_LIMIT,
+            per_group_limit=VERSUS_GUILD_LIMIT,
+            max_queue=VERSUS_QUEUE_SIZE,
+        )
         
         try:
             # Inicializa o gerenciador de chaves da API
@@ -216,15 +393,60 @@ class PUBGCompare(commands.Cog):
             self.api_key_manager = None
             logger.error(f"Erro ao inicializar o gerenciador de chaves da API do PUBG: {e}")
 
-    @app_commands.command(name='versus', description='Compara as estatísticas de rank e partidas recentes de dois jogadores de PUBG.')
+    async def cog_load(self):
+        # Sessão dedicada ao PUBG (pool keep-alive, DNS em cache, timeouts), separada do bot.http_session
+        self.http_session = acquire_pubg_session(self.bot)
+        if self.api_key_manager:
+            self.prefetch_hot_players.start()
+
+    async def cog_unload(self):
+        self.prefetch_hot_players.cancel()
+        await release_pubg_session(self.bot)
+
+    @tasks.loop(seconds=PREFETCH_INTERVAL_SECONDS)
+    async def prefetch_hot_players(self):
+        """Usa a cota ociosa da API para manter quentes os jogadores mais consultados no /versus."""
+        names = hot_players.top(HOT_PLAYERS_LIMIT)
+        if not names:
+            return
+        api_key = self.api_key_manager.get_next_key()
+        scheduler = get_key_scheduler(self.bot, api_key)
+        # Só com a chave ociosa: havendo qualquer requisição na fila, o prefetch espera o próximo ciclo
+        if any(scheduler.queued.values()):
+            logger.debug(f"Prefetch de jogadores populares adiado: fila da API ocupada ({scheduler.queued}).")
+            return
+        # Nem com o bucket baixo: um /versus que chegue logo depois precisa encontrar os tokens
+        headroom = scheduler.headroom()
+        if headroom - PREFETCH_BUDGET < COLD_VERSUS_TOKENS:
+            logger.debug(f"Prefetch de jogadores populares adiado: só ~{headroom:.0f} tokens livres na chave.")
+            return
+        try:
+            used = await prefetch_players(self.http_session, api_key, names, limiter=scheduler.lane(PREFETCH))
+            if used:
+                logger.debug(f"Prefetch de jogadores populares: {used} requisições para {names}.")
+        except PubgApiError as e:
+            logger.warning(f"Falha no prefetch de jogadores populares: {e}")
+
+    @prefetch_hot_players.before_loop
+    async def before_prefetch_hot_players(self):
+        await self.bot.wait_until_ready()
+
+    @app_commands.command(name='versus', description='Compara as estatísticas de rank e partidas recentes de 2 a 4 jogadores de PUBG.')
     @is_rank_channel_check
     @app_commands.describe(
         player1="Nome do primeiro jogador PUBG",
         player2="Nome do segundo jogador PUBG",
+        player3="Nome do terceiro jogador PUBG (opcional, para comparar o squad)",
+        player4="Nome do quarto jogador PUBG (opcional, para comparar o squad)",
         partidas="Número de partidas recentes para comparar as médias (padrão: 5)"
     )
-    async def compare(self, interaction: discord.Interaction, player1: str, player2: str, partidas: Optional[int] = 5):
-        logger.info(f"Comando compare executado por {interaction.user} para jogadores '{player1}' e '{player2}' (com {partidas} partidas).")
+    async def compare(self, interaction: discord.Interaction, player1: str, player2: str, player3: Optional[str] = None, player4: Optional[str] = None, partidas: Optional[int] = 5):
+        # Remove vazios e nomes repetidos, preservando a ordem informada
+        player_names = []
+        for name in (player1, player2, player3, player4):
+            if name and name.lower() not in {n.lower() for n in player_names}:
+                player_names.append(name)
+        logger.info(f"Comando compare executado por {interaction.user} para jogadores {player_names} (com {partidas} partidas).")
         
         if not self.api_key_manager:
             await interaction.response.send_message("❌ Erro interno: O gerenciador de chaves da API do PUBG não está configurado.", ephemeral=True)
@@ -234,34 +456,87 @@ class PUBGCompare(commands.Cog):
             await interaction.response.send_message("❌ O número de partidas deve ser entre 1 e 10.", ephemeral=True)
             return
 
-        session = self.bot.http_session
+        if len(player_names) < 2:
+            await interaction.response.send_message("❌ Informe pelo menos dois jogadores diferentes.", ephemeral=True)
+            return
+
+        # Controle de admissão: limita execuções simultâneas e recusa na hora com a fila cheia
+        try:
+            slot = self.admission.enter(interaction.guild_id)
+        except AdmissionRejectedError as e:
+            logger.warning(f"Compare de {player_names} recusado: fila do /versus cheia ({self.admission.queued} esperando).")
+            await interaction.response.send_message(f"❌ Muitas comparações em andamento e a fila está cheia. Tente novamente em ~{e.retry_in:.0f}s.", ephemeral=True)
+            return
+
+        async def report_position(position: int, eta: float):
+            await self._set_status(interaction, f"⏳ Muitas comparações em andamento. Você está na posição **{position}** da fila (estimativa: ~{eta:.0f}s).")
+
+        try:
+            await slot.wait(on_position=report_position)
+            # Responde (ou atualiza o aviso de fila) antes de buscar: com 4 jogadores e 10 partidas
+            # a busca passa fácil dos 3s que o Discord dá para a primeira resposta
+            await self._set_status(interaction, "🔎 Buscando as estatísticas...")
+            # Com todas as vagas ocupadas, menos partidas por comparação esvaziam a fila mais rápido
+            partidas_pedidas = partidas
+            if self.admission.saturated and partidas > SATURATED_MAX_MATCHES:
+                partidas = SATURATED_MAX_MATCHES
+                logger.info(f"/versus saturado: reduzindo partidas de {partidas_pedidas} para {partidas}.")
+            await self._run_compare(interaction, player_names, partidas, partidas_pedidas)
+        finally:
+            slot.release()
+
+    async def _set_status(self, interaction: discord.Interaction, content: str):
+        """
+        Mensagem efêmera de status do /versus: a primeira chamada responde à interação,
+        as seguintes editam a mesma mensagem (posição na fila, busca, erros).
+        O card sai depois num followup público.
+        """
+        try:
+            if interaction.response.is_done():
+                await interaction.edit_original_response(content=content)
+            else:
+                await interaction.response.send_message(content, ephemeral=True)
+        except discord.HTTPException as e:
+            logger.warning(f"Não foi possível atualizar o status do compare: {e}")
+
+    async def _run_compare(self, interaction: discord.Interaction, player_names: List[str], partidas: int, partidas_pedidas: int):
+        session = self.http_session
         
         # Obtém a próxima chave da fila para esta requisição
         api_key_for_this_request = self.api_key_manager.get_next_key()
-        
-        # Busca as estatísticas de ambos os jogadores em paralelo antes do defer
-        rank_stats1, match_stats1 = await asyncio.gather(
-            fetch_player_rank_stats(session, api_key_for_this_request, player1),
-            fetch_player_match_stats(session, api_key_for_this_request, player1, partidas)
-        )
-        rank_stats2, match_stats2 = await asyncio.gather(
-            fetch_player_rank_stats(session, api_key_for_this_request, player2),
-            fetch_player_match_stats(session, api_key_for_this_request, player2, partidas)
-        )
+        # Faixa interativa do escalonador da chave: passa na frente do refresh em background
+        limiter = get_key_scheduler(self.bot, api_key_for_this_request).interactive(INTERACTIVE_DEADLINE_SECONDS)
 
-        # Bloco de tratamento de erro para jogadores não encontrados
-        if not rank_stats1 and not rank_stats2:
-            await interaction.response.send_message(f"❌ Não foi possível encontrar dados para os jogadores **{player1}** e **{player2}**.", ephemeral=True)
+        # Busca as estatísticas de todos os jogadores de uma vez
+        try:
+            squad_stats = await fetch_squad_stats(session, api_key_for_this_request, player_names, partidas, limiter=limiter)
+        except PubgApiError as e:
+            if isinstance(e, DeadlineExceededError) or e.status == 429:
+                # Sem token dentro do prazo, ou um 429 cujo Retry-After não cabe nele
+                logger.warning(f"Compare de {player_names} esgotou o prazo na fila da API: {e}")
+                await self._set_status(interaction, "❌ Muitas consultas à API do PUBG no momento. Tente novamente em alguns segundos.")
+                return
+            logger.error(f"Falha na API do PUBG durante o compare: {e}")
+            await self._set_status(interaction, "❌ A API do PUBG está instável no momento. Tente novamente em alguns instantes.")
+            return
+        except Exception as e:
+            logger.error(f"Erro inesperado buscando as estatísticas de {player_names}: {e}", exc_info=True)
+            await self._set_status(interaction, "❌ Ocorreu um erro inesperado. Tente novamente mais tarde.")
             return
-        elif not rank_stats1:
-            await interaction.response.send_message(f"❌ Não foi possível encontrar dados para o jogador **{player1}**.", ephemeral=True)
+
+        # Bloco de tratamento de erro para jogadores não encontrados
+        missing = [name for name in player_names if not squad_stats.get(name)]
+        if len(missing) == 1:
+            await self._set_status(interaction, f"❌ Não foi possível encontrar dados para o jogador **{missing[0]}**.")
             return
-        elif not rank_stats2:
-            await interaction.response.send_message(f"❌ Não foi possível encontrar dados para o jogador **{player2}**.", ephemeral=True)
+        elif missing:
+            nomes = ", ".join(f"**{name}**" for name in missing[:-1]) + f" e **{missing[-1]}**"
+            await self._set_status(interaction, f"❌ Não foi possível encontrar dados para os jogadores {nomes}.")
             return
 
-        # Se não houver erros, faça o defer público
-        await interaction.response.defer(ephemeral=False)
+        # Só nicks que existem contam para a popularidade usada pelo prefetch
+        for name in player_names:
+            hot_players.record(name)
 
         try:
             # Define os caminhos dos arquivos com base na nova estrutura de pastas
@@ -272,17 +547,19 @@ class PUBGCompare(commands.Cog):
             # Verificação de arquivos para depuração
             if not os.path.exists(image_path):
                 print(f"ERRO: A imagem não foi encontrada no caminho: {image_path}")
-                await interaction.followup.send("❌ Erro interno: A imagem de fundo não foi encontrada. Verifique o arquivo e o caminho.", ephemeral=True)
+                await self._set_status(interaction, "❌ Erro interno: A imagem de fundo não foi encontrada. Verifique o arquivo e o caminho.")
                 return
 
             if not os.path.exists(font_path):
                 print(f"ERRO: A fonte não foi encontrada no caminho: {font_path}")
-                await interaction.followup.send("❌ Erro interno: A fonte não foi encontrada. Verifique o arquivo e o caminho.", ephemeral=True)
+                await self._set_status(interaction, "❌ Erro interno: A fonte não foi encontrada. Verifique o arquivo e o caminho.")
                 return
 
-            # Combina as estatísticas
-            stats1 = {**rank_stats1, **match_stats1}
-            stats2 = {**rank_stats2, **match_stats2}
+            # Estatísticas na ordem em que os jogadores foram informados
+            all_stats = [squad_stats[name] for name in player_names]
+
+            # Com mais de dois jogadores as colunas ficam mais estreitas: fontes e recuos escalam junto
+            scale = 1.0 if len(all_stats) == 2 else 2 / len(all_stats)
             
             # Carrega a imagem e cria o objeto de desenho
             img = Image.open(image_path).convert("RGBA")
@@ -290,8 +567,8 @@ class PUBGCompare(commands.Cog):
 
             # Carrega as fontes.
             try:
-                font_title = ImageFont.truetype(font_path, 100)
-                font_stats = ImageFont.truetype(font_path, 50)
+                font_title = ImageFont.truetype(font_path, int(100 * scale))
+                font_stats = ImageFont.truetype(font_path, int(50 * scale))
             except IOError:
                 logger.warning("Fonte não encontrada, usando a fonte padrão.")
                 font_title = ImageFont.load_default()
@@ -311,17 +588,31 @@ class PUBGCompare(commands.Cog):
                 down_arrow_img = Image.open(down_arrow_path).convert("RGBA")
                 
                 # Redimensiona os ícones para um tamanho adequado (ex: 70x70)
-                icon_size = (70, 70)
+                icon_size = (int(70 * scale), int(70 * scale))
                 up_arrow_img = up_arrow_img.resize(icon_size)
                 down_arrow_img = down_arrow_img.resize(icon_size)
 
             # Posições para os jogadores
             img_width, _ = img.size
-            x1_pos = img_width * 0.12
-            x2_pos = img_width * 0.69
+            if len(all_stats) == 2:
+                x_positions = [img_width * 0.12, img_width * 0.69]
+            else:
+                x_positions = [img_width * (0.04 + i * 0.94 / len(all_stats)) for i in range(len(all_stats))]
+            arrow_offset = 200 * scale
+
+            # Seta para cima se o jogador for o melhor do grupo no atributo, para baixo se for o pior
+            def paste_arrow(key, stats_dict, other_stats_list, x, y):
+                value = stats_dict.get(key)
+                others = [other.get(key) for other in other_stats_list if other and other.get(key) is not None]
+                if not up_arrow_img or value is None or not others:
+                    return
+                if value > max(others):
+                    img.paste(up_arrow_img, (int(x), int(y)), up_arrow_img)
+                elif value < min(others):
+                    img.paste(down_arrow_img, (int(x), int(y)), down_arrow_img)
 
             # Função auxiliar para desenhar o texto e os ícones
-            def draw_player_stats(stats_dict, other_stats_dict, x_start):
+            def draw_player_stats(stats_dict, other_stats_list, x_start):
                  # Adiciona um check para garantir que os dicionários não são None
                  if not stats_dict:
                      return
@@ -360,37 +651,25 @@ class PUBGCompare(commands.Cog):
                  dano_text_width = draw.textlength("DANO:", font=font_stats)
                  draw.text((x_start, y_pos), "DANO:", font=font_stats, fill=(255, 255, 255))
                  draw.text((x_start + dano_text_width + 5, y_pos), f"{stats_dict.get('avg_damage', 0):.1f}", font=font_stats, fill=(255, 165, 0))
-                 if up_arrow_img and stats_dict.get('avg_damage') is not None and other_stats_dict is not None and other_stats_dict.get('avg_damage') is not None:
-                     if stats_dict.get('avg_damage') > other_stats_dict.get('avg_damage'):
-                         img.paste(up_arrow_img, (int(x_start + dano_text_width + 200), int(y_pos)), up_arrow_img)
-                     elif stats_dict.get('avg_damage') < other_stats_dict.get('avg_damage'):
-                         img.paste(down_arrow_img, (int(x_start + dano_text_width + 200), int(y_pos)), down_arrow_img)
+                 paste_arrow('avg_damage', stats_dict, other_stats_list, x_start + dano_text_width + arrow_offset, y_pos)
                  y_pos += 70
 
                  # KILLS
                  kills_text_width = draw.textlength("KILLS:", font=font_stats)
                  draw.text((x_start, y_pos), "KILLS:", font=font_stats, fill=(255, 255, 255))
                  draw.text((x_start + kills_text_width + 5, y_pos), f"{stats_dict.get('avg_kills', 0):.1f}", font=font_stats, fill=(255, 165, 0))
-                 if up_arrow_img and stats_dict.get('avg_kills') is not None and other_stats_dict is not None and other_stats_dict.get('avg_kills') is not None:
-                     if stats_dict.get('avg_kills') > other_stats_dict.get('avg_kills'):
-                         img.paste(up_arrow_img, (int(x_start + kills_text_width + 200), int(y_pos)), up_arrow_img)
-                     elif stats_dict.get('avg_kills') < other_stats_dict.get('avg_kills'):
-                         img.paste(down_arrow_img, (int(x_start + kills_text_width + 200), int(y_pos)), down_arrow_img)
+                 paste_arrow('avg_kills', stats_dict, other_stats_list, x_start + kills_text_width + arrow_offset, y_pos)
                  y_pos += 70
 
                  # ASSISTS
                  assists_text_width = draw.textlength("ASSISTS:", font=font_stats)
                  draw.text((x_start, y_pos), "ASSISTS:", font=font_stats, fill=(255, 255, 255))
                  draw.text((x_start + assists_text_width + 5, y_pos), f"{stats_dict.get('avg_assists', 0):.1f}", font=font_stats, fill=(255, 165, 0))
-                 if up_arrow_img and stats_dict.get('avg_assists') is not None and other_stats_dict is not None and other_stats_dict.get('avg_assists') is not None:
-                     if stats_dict.get('avg_assists') > other_stats_dict.get('avg_assists'):
-                         img.paste(up_arrow_img, (int(x_start + assists_text_width + 200), int(y_pos)), up_arrow_img)
-                     elif stats_dict.get('avg_assists') < other_stats_dict.get('avg_assists'):
-                         img.paste(down_arrow_img, (int(x_start + assists_text_width + 200), int(y_pos)), down_arrow_img)
+                 paste_arrow('avg_assists', stats_dict, other_stats_list, x_start + assists_text_width + arrow_offset, y_pos)
             
-            # Desenha as estatísticas para ambos os jogadores
-            draw_player_stats(stats1, stats2, x1_pos)
-            draw_player_stats(stats2, stats1, x2_pos)
+            # Desenha as estatísticas de cada jogador
+            for i, (stats_dict, x_pos) in enumerate(zip(all_stats, x_positions)):
+                draw_player_stats(stats_dict, all_stats[:i] + all_stats[i + 1:], x_pos)
 
             # Salva a imagem em um buffer de memória
             img_buffer = io.BytesIO()
@@ -399,12 +678,15 @@ class PUBGCompare(commands.Cog):
 
             # Cria e envia o arquivo no Discord
             discord_file = discord.File(img_buffer, filename="compare_pubg.png")
-            await interaction.followup.send(file=discord_file)
+            aviso = None
+            if partidas != partidas_pedidas:
+                aviso = f"⚠️ Bot sobrecarregado: médias calculadas com as últimas {partidas} partidas em vez de {partidas_pedidas}."
+            await interaction.followup.send(content=aviso, file=discord_file)
+            await self._set_status(interaction, "✅ Comparação enviada.")
 
         except Exception as e:
             logger.error(f"Erro inesperado no comando compare: {e}", exc_info=True)
-            # Como a interação já foi deferida publicamente, este erro também será público
-            await interaction.followup.send("❌ Ocorreu um erro inesperado. Tente novamente mais tarde.", ephemeral=True)
+            await self._set_status(interaction, "❌ Ocorreu um erro inesperado. Tente novamente mais tarde.")
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(PUBGCompare(bot))
@@ -0,0 +1,141 @@
+import asyncio
+import math
+import time
+from collections import Counter, deque
+from typing import Awaitable, Callable, Hashable, Optional
+
+
+class AdmissionRejectedError(Exception):
+    def __init__(self, retry_in: float):
+        """A fila de espera está cheia; `retry_in` é a estimativa, em segundos, até abrir vaga."""
+        super().__init__(f"Fila de espera cheia. Tente novamente em ~{retry_in:.0f}s.")
+        self.retry_in = retry_in
+
+
+class AdmissionSlot:
+    def __init__(self, controller: "AdmissionController", group: Hashable):
+        self.controller = controller
+        self.group = group
+        self.granted = False
+        self.started_at: Optional[float] = None
+        self._released = False
+        self._changed = asyncio.Event()
+
+    @property
+    def position(self) -> int:
+        """Posição na fila (1 = próximo a entrar), ou 0 se já foi admitido."""
+        if self.granted:
+            return 0
+        return self.controller._queue.index(self) + 1
+
+    async def wait(self, on_position: Optional[Callable[[int, float], Awaitable[None]]] = None):
+        """
+        Espera a vez na fila. `on_position(posição, estimativa em segundos)` é chamado
+        sempre que a posição muda, para o comando avisar o usuário.
+        """
+        last_position = None
+        try:
+            while True:
+                self._changed.clear()
+                if self.granted:
+                    return
+                position = self.position
+                if on_position and position != last_position:
+                    last_position = position
+                    await on_position(position, self.controller.eta(position))
+                await self._changed.wait()
+        except asyncio.CancelledError:
+            self.release()
+            raise
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self.controller._release(self)
+
+    async def __aenter__(self):
+        await self.wait()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+
+class AdmissionController:
+    def __init__(self, global_limit: int = 4, per_group_limit: int = 2, max_queue: int = 8,
+                 initial_service_time: float = 5.0, ewma_alpha: float = 0.2):
+        """
+        Controle de admissão de um comando caro: no máximo `global_limit` execuções ao
+        mesmo tempo e `per_group_limit` por grupo (servidor). O excedente espera numa fila
+        FIFO de até `max_queue` posições; com a fila cheia, enter() recusa na hora com uma
+        estimativa de espera baseada na média móvel (EWMA) do tempo de atendimento.
+        """
+        self.global_limit = global_limit
+        self.per_group_limit = per_group_limit
+        self.max_queue = max_queue
+        self.ewma_alpha = ewma_alpha
+        self.service_time = initial_service_time
+        self.active = 0
+        self.active_per_group: Counter = Counter()
+        self._queue: deque = deque()
+
+    @property
+    def queued(self) -> int:
+        return len(self._queue)
+
+    @property
+    def saturated(self) -> bool:
+        """Todas as vagas ocupadas ou alguém esperando na fila."""
+        return bool(self._queue) or self.active >= self.global_limit
+
+    def eta(self, position: int) -> float:
+        """Estimativa de espera de quem está na posição `position` da fila."""
+        return math.ceil(position / self.global_limit) * self.service_time
+
+    def _can_run(self, group: Hashable) -> bool:
+        return self.active < self.global_limit and self.active_per_group[group] < self.per_group_limit
+
+    def _grant(self, slot: AdmissionSlot):
+        self.active += 1
+        self.active_per_group[slot.group] += 1
+        slot.granted = True
+        slot.started_at = time.monotonic()
+        slot._changed.set()
+
+    def enter(self, group: Hashable) -> AdmissionSlot:
+        """
+        Reserva uma vaga para `group`. Se houver vaga, o slot já volta admitido;
+        senão entra na fila (use slot.wait()). Levanta AdmissionRejectedError com a fila cheia.
+        Depois de cada _wake nenhum slot da fila pode rodar, então quem chega só passa
+        na frente se o bloqueio da fila for o limite de outro servidor.
+        """
+        slot = AdmissionSlot(self, group)
+        if self._can_run(group):
+            self._grant(slot)
+            return slot
+        if len(self._queue) >= self.max_queue:
+            raise AdmissionRejectedError(self.eta(len(self._queue) + 1))
+        self._queue.append(slot)
+        return slot
+
+    def _release(self, slot: AdmissionSlot):
+        if slot.granted:
+            self.active -= 1
+            self.active_per_group[slot.group] -= 1
+            if self.active_per_group[slot.group] <= 0:
+                del self.active_per_group[slot.group]
+            elapsed = time.monotonic() - slot.started_at
+            self.service_time += self.ewma_alpha * (elapsed - self.service_time)
+        elif slot in self._queue:
+            self._queue.remove(slot)
+        self._wake()
+
+    def _wake(self):
+        for slot in list(self._queue):
+            if self._can_run(slot.group):
+                self._queue.remove(slot)
+                self._grant(slot)
+        # Quem continua na fila recalcula a posição
+        for slot in self._queue:
+            slot._changed.set()
@@ -0,0 +1,242 @@
+import asyncio
+import atexit
+import json
+import logging
+import math
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# PUBG_CASSETTE_MODE=record grava as respostas reais da API; =replay serve as gravadas sem rede
+CASSETTE_MODE_ENV = 'PUBG_CASSETTE_MODE'
+CASSETTE_PATH_ENV = 'PUBG_CASSETTE_PATH'
+CASSETTE_TIME_SCALE_ENV = 'PUBG_CASSETTE_TIME_SCALE'
+DEFAULT_CASSETTE_PATH = 'pubg_api.cassette.jsonl'
+
+# Só os cabeçalhos que mudam o comportamento do bot (rate limit) vão para a fita
+RECORDED_HEADERS = ('Content-Type', 'Retry-After', 'X-Ratelimit-Limit', 'X-Ratelimit-Remaining', 'X-Ratelimit-Reset')
+
+
+def iter_cassette(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Entradas da fita na ordem em que foram gravadas. Linhas ilegíveis (a última linha
+    de um processo morto no meio da escrita) são puladas em vez de invalidar a fita.
+    """
+    skipped = 0
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                skipped += 1
+    if skipped:
+        logger.warning(f"Fita '{path}': {skipped} linhas ilegíveis ignoradas.")
+
+
+def _repair_tail(path: str):
+    """Corta uma última linha incompleta (processo morto durante a escrita) antes de continuar gravando."""
+    try:
+        size = os.path.getsize(path)
+    except FileNotFoundError:
+        return
+    if size == 0:
+        return
+    with open(path, 'rb+') as f:
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) == b'\n':
+            return
+        end = size
+        while end > 0:
+            start = max(0, end - 65536)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b'\n')
+            if newline != -1:
+                f.truncate(start + newline + 1)
+                break
+            end = start
+        else:
+            f.truncate(0)
+    logger.warning(f"Fita '{path}' terminava numa linha incompleta; a linha foi descartada.")
+
+
+class Cassette:
+    def __init__(self, path: str, mode: str, time_scale: float = 1.0):
+        """
+        Fita de respostas da API em JSON Lines compacto: uma linha por resposta com URL,
+        status, cabeçalhos de rate limit, corpo, latência, o id da gravação (`run`, um por
+        processo, já que execuções seguidas acumulam na mesma fita) e o instante relativo
+        ao início dela (`t`). Cada linha é gravada inteira (buffer por linha), então um
+        processo morto perde no máximo a linha em andamento.
+        - record: grava cada resposta real depois de recebida.
+        - replay: responde pela URL sem tocar na rede, esperando a latência gravada
+          multiplicada por `time_scale` (0 responde na hora). Gravações repetidas da
+          mesma URL são servidas em sequência, e a última se repete.
+        """
+        if mode not in ('record', 'replay'):
+            raise ValueError(f"Modo de fita inválido: '{mode}' (use 'record' ou 'replay').")
+        self.path = path
+        self.mode = mode
+        self.time_scale = time_scale
+        self.started_at = time.monotonic()
+        self.run_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+        self.recorded = 0
+        self.misses = 0
+        self._file = None
+        self._write_lock = threading.Lock()
+        self._entries: Optional[Dict[str, deque]] = None
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == 'replay'
+
+    def _write(self, line: str):
+        with self._write_lock:
+            if self._file is None:
+                # Modo append: execuções seguidas acumulam na mesma fita
+                _repair_tail(self.path)
+                self._file = open(self.path, 'a', encoding='utf-8', buffering=1)
+            self._file.write(line)
+            self.recorded += 1
+
+    async def record(self, url: str, status: int, headers, body: Any, latency: float):
+        entry = {
+            'run': self.run_id,
+            't': round(time.monotonic() - self.started_at, 3),
+            'url': url,
+            'status': status,
+            'headers': {name: headers[name] for name in RECORDED_HEADERS if name in headers},
+            'body': body,
+            'latency': round(latency, 4),
+        }
+        line = json.dumps(entry, ensure_ascii=False, separators=(',', ':'), default=str) + '\n'
+        await asyncio.to_thread(self._write, line)
+
+    def _load(self) -> Dict[str, deque]:
+        if self._entries is None:
+            entries = defaultdict(deque)
+            try:
+                for entry in iter_cassette(self.path):
+                    if isinstance(entry, dict) and entry.get('url'):
+                        entries[entry['url']].append(entry)
+            except FileNotFoundError:
+                logger.error(f"Fita '{self.path}' não encontrada. Todas as requisições vão responder 404.")
+            except (OSError, ValueError) as e:
+                logger.error(f"Erro ao ler a fita '{self.path}': {type(e).__name__} {e}. Usando as {sum(len(v) for v in entries.values())} respostas lidas até aqui.")
+            self._entries = entries
+            logger.info(f"Fita '{self.path}' carregada: {sum(len(v) for v in entries.values())} respostas de {len(entries)} URLs.")
+        return self._entries
+
+    async def play(self, url: str) -> Tuple[int, Dict[str, str], Any]:
+        """Resposta gravada para a URL, no formato (status, cabeçalhos, corpo) do _send."""
+        recordings = self._load().get(url)
+        if not recordings:
+            self.misses += 1
+            logger.warning(f"URL sem gravação na fita: {url}")
+            return 404, {}, "Sem gravação na fita."
+        entry = recordings.popleft() if len(recordings) > 1 else recordings[0]
+        if self.time_scale > 0:
+            await asyncio.sleep(entry.get('latency', 0) * self.time_scale)
+        return entry.get('status', 404), entry.get('headers') or {}, entry.get('body')
+
+    def close(self):
+        with self._write_lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+                logger.info(f"Fita '{self.path}' fechada com {self.recorded} respostas gravadas.")
+
+
+async def replay_schedule(path: str, time_scale: float = 1.0) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Entrega as entradas da fita nos instantes relativos em que foram gravadas
+    (multiplicados por `time_scale`), para reproduzir offline o padrão de tráfego
+    real, ex.: o pico de /versus da noite, contra o cache e o escalonador.
+    Cada gravação (`run`) recomeça o `t` do zero, então as gravações são tocadas
+    em sequência: a próxima começa onde a anterior terminou.
+    """
+    start = time.monotonic()
+    run = None
+    run_offset = 0.0
+    last_t = 0.0
+    for entry in iter_cassette(path):
+        t = entry.get('t', 0)
+        if entry.get('run') != run:
+            run = entry.get('run')
+            run_offset += last_t
+        last_t = t
+        wait = (run_offset + t) * time_scale - (time.monotonic() - start)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        yield entry
+
+
+async def replay_traffic(path: str, time_scale: float = 1.0) -> Dict[str, Any]:
+    """
+    Driver do replay_schedule: dispara cada URL gravada no seu instante pelo
+    request_json, com a fita em replay (sem rede) e passando por um escalonador de
+    chave como o das cogs (/matches fica de fora, como no bot), e resume o tempo até
+    a resposta (fila + latência gravada) e os erros. Use com PUBG_CASSETTE_MODE=replay
+    apontando para a mesma fita; veja o bloco __main__ no fim do arquivo.
+    """
+    from defi.resilience import request_json
+    from defi.scheduler import PriorityRequestScheduler, INTERACTIVE
+    from defi.shared_rate_limiter import create_rate_limiter
+
+    cassette = get_cassette()
+    if cassette is None or not cassette.replaying:
+        raise RuntimeError(f"Defina {CASSETTE_MODE_ENV}=replay para tocar a fita sem rede.")
+
+    scheduler = PriorityRequestScheduler(create_rate_limiter('replay'))
+    durations = []
+    errors = Counter()
+
+    async def fire(url: str):
+        limiter = None if '/matches/' in url else scheduler.lane(INTERACTIVE)
+        started = time.monotonic()
+        try:
+            await request_json(None, url, {}, limiter=limiter)
+            durations.append(time.monotonic() - started)
+        except Exception as e:
+            errors[type(e).__name__] += 1
+
+    tasks = [asyncio.create_task(fire(entry['url'])) async for entry in replay_schedule(path, time_scale) if entry.get('url')]
+    await asyncio.gather(*tasks)
+
+    durations.sort()
+    def percentile(q: float) -> Optional[float]:
+        return durations[max(0, math.ceil(q * len(durations)) - 1)] if durations else None
+    return {'requests': len(tasks), 'errors': dict(errors), 'p50': percentile(0.50), 'p95': percentile(0.95), 'misses': cassette.misses}
+
+
+if __name__ == '__main__':
+    # PUBG_CASSETTE_MODE=replay PUBG_CASSETTE_PATH=fita.jsonl python -m defi.cassette [escala de tempo]
+    logging.basicConfig(level=logging.INFO)
+    scale = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+    path = os.getenv(CASSETTE_PATH_ENV) or DEFAULT_CASSETTE_PATH
+    print(asyncio.run(replay_traffic(path, scale)))
+
+
+_cassette: Optional[Cassette] = None
+_cassette_checked = False
+
+
+def get_cassette() -> Optional[Cassette]:
+    """Fita do processo conforme PUBG_CASSETTE_MODE, ou None (padrão) para falar só com a API."""
+    global _cassette, _cassette_checked
+    if not _cassette_checked:
+        _cassette_checked = True
+        mode = os.getenv(CASSETTE_MODE_ENV)
+        if mode:
+            path = os.getenv(CASSETTE_PATH_ENV) or DEFAULT_CASSETTE_PATH
+            time_scale = float(os.getenv(CASSETTE_TIME_SCALE_ENV) or 1.0)
+            _cassette = Cassette(path, mode.lower(), time_scale=time_scale)
+            atexit.register(_cassette.close)
+            logger.warning(f"API do PUBG em modo '{_cassette.mode}' com a fita '{path}' (escala de tempo {time_scale}).")
+    return _cassette
@@ -0,0 +1,87 @@
+import math
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional
+
+
+class TTLCache:
+    def __init__(self, ttl: float, max_entries: int = 1024):
+        """Cache LRU em memória cujas entradas expiram `ttl` segundos depois de gravadas."""
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, value = entry
+        if time.monotonic() - stored_at >= self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def age(self, key: Hashable) -> Optional[float]:
+        """Segundos desde a gravação da entrada, ou None se ela não existe ou expirou."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        age = time.monotonic() - entry[0]
+        return age if age < self.ttl else None
+
+    def set(self, key: Hashable, value: Any):
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class HotPlayerTracker:
+    def __init__(self, half_life: float = 6 * 3600, max_entries: int = 2048):
+        """
+        Popularidade dos nicks consultados: cada consulta soma 1 a um contador que
+        decai pela metade a cada `half_life` segundos, então quem parou de ser
+        consultado sai do topo sozinho.
+        """
+        self.half_life = half_life
+        self.max_entries = max_entries
+        # nick em minúsculas -> [pontuação, instante da última atualização, nick como digitado]
+        self._scores: Dict[str, list] = {}
+
+    def _decayed(self, entry: list, now: float) -> float:
+        return entry[0] * math.pow(0.5, (now - entry[1]) / self.half_life)
+
+    def record(self, name: str):
+        now = time.monotonic()
+        key = name.lower()
+        entry = self._scores.get(key)
+        if entry is None:
+            self._scores[key] = [1.0, now, name]
+        else:
+            entry[0] = self._decayed(entry, now) + 1.0
+            entry[1] = now
+            entry[2] = name
+        if len(self._scores) > self.max_entries:
+            self._prune(now)
+
+    def _prune(self, now: float):
+        # Descarta a metade menos popular em vez de um por vez, para não ordenar a cada consulta
+        ranked = sorted(self._scores, key=lambda key: self._decayed(self._scores[key], now))
+        for key in ranked[:len(ranked) // 2]:
+            del self._scores[key]
+
+    def forget(self, name: str):
+        self._scores.pop(name.lower(), None)
+
+    def score(self, name: str) -> float:
+        entry = self._scores.get(name.lower())
+        return self._decayed(entry, time.monotonic()) if entry else 0.0
+
+    def top(self, limit: int, min_score: float = 2.0) -> List[str]:
+        """Os `limit` nicks mais consultados com pontuação de pelo menos `min_score`."""
+        now = time.monotonic()
+        scored = [(self._decayed(entry, now), entry[2]) for entry in self._scores.values()]
+        scored = [item for item in scored if item[0] >= min_score]
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [name for _, name in scored[:limit]]
@@ -0,0 +1,163 @@
+import asyncio
+import logging
+import math
+import os
+from collections import deque
+from typing import Any, Dict, Optional
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+# Conexões keep-alive por chave de API; o limite por host escala com o pool de chaves
+CONNECTIONS_PER_KEY = 4
+MIN_CONNECTIONS_PER_HOST = 8
+DNS_CACHE_TTL = 300
+KEEPALIVE_TIMEOUT = 60
+
+# Sem timeout total: o telemetry tem dezenas de MB. Conexão e cada leitura têm prazo próprio.
+# Sem `connect`: no aiohttp ele inclui a espera por uma vaga no pool, e essa espera
+# virava TimeoutError contado como falha pelo circuit breaker com a API saudável.
+PUBG_TIMEOUT = aiohttp.ClientTimeout(total=None, sock_connect=5, sock_read=15)
+
+# Acima disso o tempo até o primeiro byte vira aviso no log
+SLOW_TTFB_SECONDS = 2.0
+
+
+class RequestMetrics:
+    def __init__(self, window: int = 500):
+        """Tempos de DNS, conexão e TTFB das últimas `window` requisições."""
+        self.samples = deque(maxlen=window)
+        self.errors = 0
+
+    def record(self, sample: Dict[str, Any]):
+        self.samples.append(sample)
+
+    def summary(self) -> Dict[str, Any]:
+        """p50/p95 de cada fase e a taxa de reaproveitamento de conexões."""
+        result = {"requests": len(self.samples), "errors": self.errors}
+        if not self.samples:
+            return result
+        for phase in ("dns", "connect", "ttfb"):
+            values = sorted(s[phase] for s in self.samples if s.get(phase) is not None)
+            if values:
+                result[f"{phase}_p50"] = values[max(0, math.ceil(0.50 * len(values)) - 1)]
+                result[f"{phase}_p95"] = values[max(0, math.ceil(0.95 * len(values)) - 1)]
+        result["reused_ratio"] = sum(1 for s in self.samples if s.get("reused")) / len(self.samples)
+        return result
+
+
+def create_trace_config(metrics: RequestMetrics) -> aiohttp.TraceConfig:
+    """TraceConfig que mede DNS, conexão e tempo até o primeiro byte de cada requisição."""
+    trace_config = aiohttp.TraceConfig()
+
+    async def on_request_start(session, ctx, params):
+        ctx.now = asyncio.get_running_loop().time
+        ctx.start = ctx.now()
+        ctx.dns = None
+        ctx.connect = None
+        ctx.reused = False
+
+    async def on_dns_resolvehost_start(session, ctx, params):
+        ctx.dns_start = ctx.now()
+
+    async def on_dns_resolvehost_end(session, ctx, params):
+        ctx.dns = ctx.now() - ctx.dns_start
+
+    async def on_connection_create_start(session, ctx, params):
+        ctx.connect_start = ctx.now()
+
+    async def on_connection_create_end(session, ctx, params):
+        ctx.connect = ctx.now() - ctx.connect_start
+
+    async def on_connection_reuseconn(session, ctx, params):
+        ctx.reused = True
+
+    async def on_request_end(session, ctx, params):
+        # Disparado quando os cabeçalhos da resposta chegam, antes do corpo
+        ttfb = ctx.now() - ctx.start
+        metrics.record({
+            "host": params.url.host,
+            "status": params.response.status,
+            "dns": ctx.dns,
+            "connect": ctx.connect,
+            "ttfb": ttfb,
+            "reused": ctx.reused,
+        })
+        dns = f"{ctx.dns * 1000:.0f}ms" if ctx.dns is not None else "cache"
+        connect = f"{ctx.connect * 1000:.0f}ms" if ctx.connect is not None else "keep-alive"
+        message = f"{params.method} {params.url.path} -> {params.response.status} (DNS: {dns}, conexão: {connect}, TTFB: {ttfb * 1000:.0f}ms)"
+        if ttfb > SLOW_TTFB_SECONDS:
+            logger.warning(f"Requisição lenta: {message}")
+        else:
+            logger.debug(message)
+
+    async def on_request_exception(session, ctx, params):
+        metrics.errors += 1
+
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_dns_resolvehost_start.append(on_dns_resolvehost_start)
+    trace_config.on_dns_resolvehost_end.append(on_dns_resolvehost_end)
+    trace_config.on_connection_create_start.append(on_connection_create_start)
+    trace_config.on_connection_create_end.append(on_connection_create_end)
+    trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+    trace_config.on_request_end.append(on_request_end)
+    trace_config.on_request_exception.append(on_request_exception)
+    return trace_config
+
+
+def count_api_keys(key_prefix: str = "PUBG_API_KEY") -> int:
+    return sum(1 for key, value in os.environ.items() if key.startswith(key_prefix) and value)
+
+
+def connections_per_host(key_count: int) -> int:
+    return max(MIN_CONNECTIONS_PER_HOST, CONNECTIONS_PER_KEY * key_count)
+
+
+def create_pubg_session(key_count: int, metrics: Optional[RequestMetrics] = None) -> aiohttp.ClientSession:
+    """
+    Sessão exclusiva do tráfego do PUBG (api.pubg.com e CDN do telemetry), separada do
+    bot.http_session das outras cogs: pool keep-alive, cache de DNS, limite de conexões
+    por host proporcional ao número de chaves, gzip e timeouts explícitos.
+    """
+    per_host = connections_per_host(key_count)
+    connector = aiohttp.TCPConnector(
+        limit=per_host * 2,
+        limit_per_host=per_host,
+        use_dns_cache=True,
+        ttl_dns_cache=DNS_CACHE_TTL,
+        keepalive_timeout=KEEPALIVE_TIMEOUT,
+        enable_cleanup_closed=True,
+    )
+    trace_configs = [create_trace_config(metrics)] if metrics is not None else None
+    logger.info(f"Criando sessão HTTP do PUBG: {per_host} conexões por host, DNS em cache por {DNS_CACHE_TTL}s.")
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=PUBG_TIMEOUT,
+        headers={"Accept-Encoding": "gzip"},
+        trace_configs=trace_configs,
+    )
+
+
+def acquire_pubg_session(bot) -> aiohttp.ClientSession:
+    """
+    Sessão do PUBG compartilhada pelas cogs através do bot. Cada cog chama no
+    cog_load e devolve com release_pubg_session no cog_unload; a última a sair fecha.
+    """
+    session = getattr(bot, 'pubg_http_session', None)
+    if session is None or session.closed:
+        bot.pubg_http_metrics = getattr(bot, 'pubg_http_metrics', None) or RequestMetrics()
+        session = bot.pubg_http_session = create_pubg_session(count_api_keys(), bot.pubg_http_metrics)
+        bot.pubg_http_session_users = 0
+    bot.pubg_http_session_users += 1
+    return session
+
+
+async def release_pubg_session(bot):
+    session = getattr(bot, 'pubg_http_session', None)
+    if session is None:
+        return
+    bot.pubg_http_session_users -= 1
+    if bot.pubg_http_session_users <= 0 and not session.closed:
+        logger.info(f"Fechando sessão HTTP do PUBG. Métricas: {bot.pubg_http_metrics.summary()}")
+        await session.close()
@@ -0,0 +1,29 @@
+import json
+import logging
+import os
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def load_json(path: str, description: str = "arquivo JSON") -> Optional[Any]:
+    """Conteúdo do arquivo, ou None se ele não existir ou estiver ilegível (com erro no log)."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, json.JSONDecodeError) as e:
+        logger.error(f"Erro ao ler {description} em '{path}': {e}")
+        return None
+
+
+def save_json(path: str, data: Any):
+    """
+    Grava de forma atômica (arquivo temporário + os.replace, como o snapshot): quem lê,
+    inclusive outro shard, vê o arquivo antigo ou o novo inteiro, nunca um pela metade.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
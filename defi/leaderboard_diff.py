@@ -0,0 +1,80 @@
+import logging
+from typing import Any, Dict, Tuple
+
+from defi.leaderboard_snapshot import SnapshotReader, TIERS
+
+logger = logging.getLogger(__name__)
+
+# A partir destes limites o jogador entra em 'big_movers' e dispara a notificação
+BIG_MOVER_RANK_DELTA = 50
+BIG_MOVER_POINTS_DELTA = 200
+
+# id da conta -> (rank, pontos, índice do tier, subTier, nome)
+SnapshotIndex = Dict[str, Tuple[int, int, int, int, str]]
+
+
+def index_snapshot(reader: SnapshotReader) -> SnapshotIndex:
+    """Indexa por Account ID a geração mapeada no leitor. Chamar antes de trocar o snapshot."""
+    if not reader.available:
+        return {}
+    _, _, tiers, sub_tiers = reader.columns()
+    index = {}
+    for i in range(reader.count):
+        player = reader.player(i)
+        if player['id']:
+            index[player['id']] = (player['rank'], player['rankPoints'], tiers[i], sub_tiers[i], player['name'])
+    return index
+
+
+def _entry(account_id: str, row: tuple) -> Dict[str, Any]:
+    rank, points, tier, sub_tier, name = row
+    return {'id': account_id, 'name': name, 'rank': rank, 'rankPoints': points, 'tier': TIERS[tier], 'subTier': str(sub_tier)}
+
+
+def compute_snapshot_diff(previous: SnapshotIndex, previous_generation: int, reader: SnapshotReader) -> Dict[str, Any]:
+    """
+    Compara, numa passada pelas colunas da geração atual, cada conta com a geração
+    anterior (`previous`, de index_snapshot): variação de rank e pontos, promoções e
+    rebaixamentos de tier/subTier, quem entrou e quem saiu do leaderboard.
+    `movement` guarda [variação de rank, variação de pontos] por Account ID; variação
+    de rank positiva é subida.
+    """
+    current = index_snapshot(reader)
+    movement = {}
+    promotions, demotions, entries, big_movers = [], [], [], []
+
+    for account_id, row in current.items():
+        before = previous.get(account_id)
+        if before is None:
+            entries.append(_entry(account_id, row))
+            continue
+        rank_delta = before[0] - row[0]
+        points_delta = row[1] - before[1]
+        if rank_delta or points_delta:
+            movement[account_id] = [rank_delta, points_delta]
+
+        # (tier, subTier): menor é melhor, Survivor antes de Master e subTier 1 antes do 5.
+        # Tier desconhecido (índice 0) não conta como promoção nem rebaixamento.
+        if row[2] and before[2]:
+            old_order, new_order = (before[2], before[3]), (row[2], row[3])
+            if new_order != old_order:
+                change = {**_entry(account_id, row), 'fromTier': TIERS[before[2]], 'fromSubTier': str(before[3])}
+                (promotions if new_order < old_order else demotions).append(change)
+
+        if abs(rank_delta) >= BIG_MOVER_RANK_DELTA or abs(points_delta) >= BIG_MOVER_POINTS_DELTA:
+            big_movers.append({**_entry(account_id, row), 'rankDelta': rank_delta, 'pointsDelta': points_delta})
+
+    exits = [_entry(account_id, row) for account_id, row in previous.items() if account_id not in current]
+
+    big_movers.sort(key=lambda mover: abs(mover['rankDelta']), reverse=True)
+    return {
+        'generation': reader.generation,
+        'previous_generation': previous_generation,
+        'created_at': reader.created_at,
+        'movement': movement,
+        'promotions': promotions,
+        'demotions': demotions,
+        'entries': entries,
+        'exits': sorted(exits, key=lambda player: player['rank']),
+        'big_movers': big_movers,
+    }
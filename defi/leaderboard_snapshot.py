@@ -0,0 +1,213 @@
+import logging
+import mmap
+import os
+import struct
+import time
+from typing import Any, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem flock, cada processo volta a ser escritor
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Formato binário do snapshot (little-endian), colunar:
+#   cabeçalho | rank u32[n] | rankPoints i32[n] | tier u8[n] | subTier u8[n]
+#   | offsets de nome u32[n+1] | nomes utf-8 | offsets de id u32[n+1] | ids utf-8
+SNAPSHOT_MAGIC = b'PLBS'
+SNAPSHOT_FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sHHQdIII')  # magic, formato, reservado, geração, criado_em, n, bytes de nomes, bytes de ids
+
+# Índice da coluna de tier; 0 fica reservado para tiers desconhecidos
+TIERS = ["Unknown", "Survivor", "Master", "Diamond", "Crystal", "Platinum", "Gold", "Silver", "Bronze"]
+TIER_INDEX = {tier: i for i, tier in enumerate(TIERS)}
+
+
+def _pack_strings(values: List[str]):
+    offsets = [0]
+    blob = bytearray()
+    for value in values:
+        blob += value.encode('utf-8')
+        offsets.append(len(blob))
+    return struct.pack(f'<{len(offsets)}I', *offsets), bytes(blob)
+
+
+def read_generation(path: str) -> int:
+    """Geração gravada no snapshot em `path`, ou 0 se não existir/for inválido."""
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(HEADER.size)
+        magic, fmt, _, generation, _, _, _, _ = HEADER.unpack(header)
+        if magic == SNAPSHOT_MAGIC and fmt == SNAPSHOT_FORMAT_VERSION:
+            return generation
+    except (OSError, struct.error):
+        pass
+    return 0
+
+
+def write_snapshot(path: str, players: List[Dict[str, Any]]) -> int:
+    """
+    Grava os jogadores (dicts com 'id', 'name', 'rank', 'rankPoints', 'tier' e 'subTier')
+    num snapshot ordenado por rank. A troca é atômica (arquivo temporário + os.replace),
+    então leitores com o arquivo antigo mapeado nunca veem um snapshot pela metade.
+    Retorna a nova geração.
+    """
+    rows = sorted(players, key=lambda p: p['rank'])
+    n = len(rows)
+    generation = read_generation(path) + 1
+
+    names_offsets, names_blob = _pack_strings([p['name'] for p in rows])
+    ids_offsets, ids_blob = _pack_strings([p.get('id') or '' for p in rows])
+
+    parts = [
+        HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_FORMAT_VERSION, 0, generation, time.time(), n, len(names_blob), len(ids_blob)),
+        struct.pack(f'<{n}I', *(int(p['rank']) for p in rows)),
+        struct.pack(f'<{n}i', *(int(p['rankPoints']) for p in rows)),
+        bytes(TIER_INDEX.get(p['tier'], 0) for p in rows),
+        bytes(int(p['subTier']) if str(p['subTier']).isdigit() else 0 for p in rows),
+        names_offsets, names_blob,
+        ids_offsets, ids_blob,
+    ]
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        for part in parts:
+            f.write(part)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return generation
+
+
+class SnapshotReader:
+    def __init__(self, path: str):
+        """
+        Leitor somente-leitura de um snapshot via mmap. Vários processos mapeiam o
+        mesmo arquivo e dividem o page cache; `refresh()` remapeia quando o escritor
+        troca o arquivo.
+        """
+        self.path = path
+        self._mm: Optional[mmap.mmap] = None
+        self._file_key = None
+        self.generation = 0
+        self.created_at = 0.0
+        self.count = 0
+        self._tier_rows: Dict[str, List[int]] = {}
+
+    @property
+    def available(self) -> bool:
+        return self._mm is not None
+
+    def refresh(self) -> bool:
+        """Remapeia o arquivo se ele mudou desde o último mapeamento. Retorna True se recarregou."""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        file_key = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if file_key == self._file_key:
+            return False
+        # Arquivo vazio ou cortado (ex.: escrito fora do write_snapshot): o mmap recusaria
+        # o tamanho zero e o cabeçalho não caberia
+        if st.st_size < HEADER.size:
+            logger.error(f"Snapshot '{self.path}' com {st.st_size} bytes, menor que o cabeçalho. Ignorando.")
+            return False
+
+        with open(self.path, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, fmt, _, generation, created_at, n, names_len, ids_len = HEADER.unpack_from(mm, 0)
+        if magic != SNAPSHOT_MAGIC or fmt != SNAPSHOT_FORMAT_VERSION:
+            logger.error(f"Snapshot '{self.path}' com formato desconhecido (magic={magic!r}, versão={fmt}). Ignorando.")
+            mm.close()
+            return False
+        expected_size = HEADER.size + 10 * n + 8 * (n + 1) + names_len + ids_len
+        if len(mm) < expected_size:
+            logger.error(f"Snapshot '{self.path}' truncado: {len(mm)} bytes, o cabeçalho indica {expected_size}. Ignorando.")
+            mm.close()
+            return False
+
+        offset = HEADER.size
+        self._ranks = memoryview(mm)[offset:offset + 4 * n].cast('I'); offset += 4 * n
+        self._points = memoryview(mm)[offset:offset + 4 * n].cast('i'); offset += 4 * n
+        self._tiers = memoryview(mm)[offset:offset + n]; offset += n
+        self._sub_tiers = memoryview(mm)[offset:offset + n]; offset += n
+        self._name_offsets = memoryview(mm)[offset:offset + 4 * (n + 1)].cast('I'); offset += 4 * (n + 1)
+        self._names = memoryview(mm)[offset:offset + names_len]; offset += names_len
+        self._id_offsets = memoryview(mm)[offset:offset + 4 * (n + 1)].cast('I'); offset += 4 * (n + 1)
+        self._ids = memoryview(mm)[offset:offset + ids_len]
+
+        # O mmap anterior é liberado quando as últimas views dele saem de escopo
+        self._mm = mm
+        self._file_key = file_key
+        self._tier_rows = {}
+        self.generation = generation
+        self.created_at = created_at
+        self.count = n
+        logger.info(f"Snapshot do leaderboard carregado: geração {generation}, {n} jogadores.")
+        return True
+
+    def columns(self):
+        """Colunas (rank, rankPoints, tier, subTier) como views sobre o mmap, sem cópia."""
+        if self._mm is None:
+            return [], [], b'', b''
+        return self._ranks, self._points, self._tiers, self._sub_tiers
+
+    def _name(self, i: int) -> str:
+        return bytes(self._names[self._name_offsets[i]:self._name_offsets[i + 1]]).decode('utf-8')
+
+    def _account_id(self, i: int) -> str:
+        return bytes(self._ids[self._id_offsets[i]:self._id_offsets[i + 1]]).decode('utf-8')
+
+    def player(self, i: int) -> Dict[str, Any]:
+        return {
+            'id': self._account_id(i),
+            'name': self._name(i),
+            'tier': TIERS[self._tiers[i]],
+            'subTier': str(self._sub_tiers[i]),
+            'rank': self._ranks[i],
+            'rankPoints': self._points[i],
+        }
+
+    def tier_rows(self, tier: str) -> List[int]:
+        """Linhas do tier em ordem de rank; calculado uma vez por geração."""
+        rows = self._tier_rows.get(tier)
+        if rows is None:
+            tier_index = TIER_INDEX.get(tier)
+            rows = self._tier_rows[tier] = [i for i in range(self.count) if self._tiers[i] == tier_index] if self._mm is not None else []
+        return rows
+
+
+class SnapshotWriterLock:
+    def __init__(self, lock_path: str):
+        """
+        Eleição do escritor entre processos do mesmo host via flock não bloqueante.
+        O lock some junto com o processo, então outro shard assume na próxima tentativa.
+        """
+        self.lock_path = lock_path
+        self._fd: Optional[int] = None
+
+    @property
+    def is_writer(self) -> bool:
+        return self._fd is not None or fcntl is None
+
+    def try_acquire(self) -> bool:
+        if self.is_writer:
+            return True
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        logger.info(f"Processo {os.getpid()} eleito escritor do snapshot do leaderboard.")
+        return True
+
+    def release(self):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
@@ -0,0 +1,101 @@
+import logging
+import math
+from collections import Counter
+from typing import Any, Dict, Optional
+
+from defi.leaderboard_snapshot import SnapshotReader, TIERS
+
+logger = logging.getLogger(__name__)
+
+# Posições de rank (geral e dentro de cada tier) cujos pontos viram "nota de corte"
+RANK_CUTOFFS = [1, 10, 50, 100, 250, 500]
+TIER_CUTOFFS = [1, 10, 50, 100]
+PERCENTILES = [10, 25, 50, 75, 90, 99]
+
+
+def _nearest_rank(sorted_values, p: float):
+    """Percentil pelo método nearest-rank sobre valores já ordenados."""
+    if not sorted_values:
+        return None
+    index = max(0, math.ceil(p / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def _deltas(current: Dict[str, Any], previous: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        key: value - previous[key]
+        for key, value in current.items()
+        if value is not None and previous.get(key) is not None
+    }
+
+
+def compute_leaderboard_stats(reader: SnapshotReader, previous: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Calcula, uma vez por atualização, as estatísticas servidas pelo /cutoffs direto
+    das colunas do snapshot mapeado: contagem por tier/subTier, pontos nas posições de
+    corte, percentis e a variação em relação à atualização anterior (`previous`).
+    """
+    ranks, points, tiers, sub_tiers = reader.columns()
+    n = reader.count
+
+    # As colunas já vêm em ordem de rank: a posição k do geral é o índice k-1
+    cutoffs = {str(pos): points[pos - 1] if pos <= n else None for pos in RANK_CUTOFFS}
+    sorted_points = sorted(points)
+    percentiles = {str(p): _nearest_rank(sorted_points, p) for p in PERCENTILES}
+
+    tier_counts = Counter(bytes(tiers))
+    sub_tier_counts = Counter(zip(bytes(tiers), bytes(sub_tiers)))
+
+    tier_points: Dict[int, list] = {index: [] for index in tier_counts}
+    sub_tier_entry: Dict[tuple, int] = {}
+    for i in range(n):
+        tier_points[tiers[i]].append(points[i])
+        key = (tiers[i], sub_tiers[i])
+        if key not in sub_tier_entry or points[i] < sub_tier_entry[key]:
+            sub_tier_entry[key] = points[i]
+
+    tiers_stats = {}
+    for index, tier in enumerate(TIERS):
+        if index not in tier_counts:
+            continue
+        in_tier = tier_points[index]  # em ordem de rank dentro do tier
+        tiers_stats[tier] = {
+            'count': tier_counts[index],
+            'sub_tiers': {
+                str(sub): sub_tier_counts[(index, sub)]
+                for sub in sorted({s for t, s in sub_tier_counts if t == index})
+            },
+            'sub_tier_entry': {
+                str(sub): sub_tier_entry[(index, sub)]
+                for sub in sorted({s for t, s in sub_tier_entry if t == index})
+            },
+            'min_points': min(in_tier),
+            'max_points': max(in_tier),
+            'cutoffs': {str(pos): in_tier[pos - 1] if pos <= len(in_tier) else None for pos in TIER_CUTOFFS},
+        }
+
+    stats = {
+        'generation': reader.generation,
+        'created_at': reader.created_at,
+        'total_players': n,
+        'tiers': tiers_stats,
+        'cutoffs': cutoffs,
+        'percentiles': percentiles,
+        'deltas': None,
+    }
+
+    if previous and previous.get('generation') != reader.generation:
+        previous_tiers = previous.get('tiers', {})
+        stats['deltas'] = {
+            'generation': previous.get('generation'),
+            'created_at': previous.get('created_at'),
+            'total_players': n - previous.get('total_players', 0),
+            'tiers': {
+                tier: tiers_stats.get(tier, {}).get('count', 0) - previous_tiers.get(tier, {}).get('count', 0)
+                for tier in TIERS
+                if tier in tiers_stats or tier in previous_tiers
+            },
+            'cutoffs': _deltas(cutoffs, previous.get('cutoffs', {})),
+            'percentiles': _deltas(percentiles, previous.get('percentiles', {})),
+        }
+    return stats
@@ -0,0 +1,176 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Caminho do banco de partidas; por padrão um arquivo no diretório do bot
+MATCH_STORE_DB_ENV = 'PUBG_MATCH_STORE_DB'
+DEFAULT_MATCH_STORE_DB = 'pubg_matches.db'
+
+# O SQLite limita os parâmetros por consulta; listas de IDs maiores vão em lotes
+_MAX_SQL_PARAMS = 500
+
+# Partidas mais antigas que isso são apagadas (a API só lista as dos últimos 14 dias,
+# o resto serve apenas às médias históricas); a limpeza roda no máximo uma vez por intervalo
+MATCH_RETENTION_DAYS = 30
+PRUNE_INTERVAL_SECONDS = 3600
+
+
+class MatchStore:
+    def __init__(self, db_path: str, retention_days: float = MATCH_RETENTION_DAYS):
+        """
+        Guarda em SQLite uma linha por participante de cada partida baixada (as ~100,
+        não só as do jogador consultado), com índice por conta. Partidas já vistas não
+        são baixadas de novo para nenhum dos participantes. Métodos async rodam a
+        consulta numa thread, como o SharedRateLimiter.
+        """
+        self.db_path = db_path
+        self.retention_days = retention_days
+        self._conn = None
+        self._conn_lock = threading.Lock()
+        self._last_prune = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS matches ('
+                'match_id TEXT PRIMARY KEY, created_at TEXT NOT NULL, game_mode TEXT, map_name TEXT, '
+                'participants INTEGER NOT NULL)'
+            )
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS participants ('
+                'match_id TEXT NOT NULL, account_id TEXT NOT NULL, name TEXT NOT NULL, '
+                'damage REAL NOT NULL, kills INTEGER NOT NULL, assists INTEGER NOT NULL, '
+                'placement INTEGER, created_at TEXT NOT NULL, '
+                'PRIMARY KEY (match_id, account_id)) WITHOUT ROWID'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS matches_by_date ON matches (created_at)')
+            conn.execute('CREATE INDEX IF NOT EXISTS participants_by_account ON participants (account_id, created_at)')
+            conn.execute('CREATE INDEX IF NOT EXISTS participants_by_name ON participants (name COLLATE NOCASE, created_at)')
+            logger.info(f"Banco de partidas aberto em '{self.db_path}'.")
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _batches(values: List[str]):
+        for start in range(0, len(values), _MAX_SQL_PARAMS):
+            yield values[start:start + _MAX_SQL_PARAMS]
+
+    def store_match(self, match_data: Dict[str, Any]) -> int:
+        """Grava a partida e todos os participantes dela. Retorna quantos participantes gravou."""
+        data = match_data.get("data", {})
+        match_id = data.get("id")
+        attributes = data.get("attributes", {})
+        created_at = attributes.get("createdAt", "")
+        if not match_id:
+            return 0
+
+        rows = []
+        for item in match_data.get("included", []):
+            if item.get("type") != "participant":
+                continue
+            stats = item.get("attributes", {}).get("stats", {})
+            account_id = stats.get("playerId")
+            if not account_id:
+                continue
+            rows.append((
+                match_id, account_id, stats.get("name", ""),
+                stats.get("damageDealt", 0.0), stats.get("kills", 0), stats.get("assists", 0),
+                stats.get("winPlace"), created_at,
+            ))
+
+        with self._conn_lock:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO matches (match_id, created_at, game_mode, map_name, participants) VALUES (?, ?, ?, ?, ?)',
+                    (match_id, created_at, attributes.get("gameMode"), attributes.get("mapName"), len(rows))
+                )
+                conn.executemany(
+                    'INSERT OR REPLACE INTO participants '
+                    '(match_id, account_id, name, damage, kills, assists, placement, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    rows
+                )
+        return len(rows)
+
+    def store_matches(self, match_documents: List[Dict[str, Any]]) -> int:
+        """Grava várias partidas e, se já deu o intervalo, apaga as que passaram da retenção."""
+        stored = sum(self.store_match(match_data) for match_data in match_documents)
+        if self._last_prune is None or time.monotonic() - self._last_prune >= PRUNE_INTERVAL_SECONDS:
+            self.prune()
+        return stored
+
+    def prune(self) -> int:
+        """Apaga partidas (e os participantes delas) mais antigas que `retention_days`. Retorna quantas."""
+        # createdAt da API é ISO 8601 em UTC, então a comparação de texto segue a ordem cronológica
+        cutoff = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(time.time() - self.retention_days * 86400))
+        with self._conn_lock:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    'DELETE FROM participants WHERE match_id IN (SELECT match_id FROM matches WHERE created_at < ?)', (cutoff,)
+                )
+                removed = conn.execute('DELETE FROM matches WHERE created_at < ?', (cutoff,)).rowcount
+            self._last_prune = time.monotonic()
+        if removed:
+            logger.info(f"Match store: {removed} partidas anteriores a {cutoff} apagadas.")
+        return removed
+
+    def stored_match_ids(self, match_ids: Iterable[str]) -> Set[str]:
+        match_ids = list(match_ids)
+        found = set()
+        with self._conn_lock:
+            conn = self._connect()
+            for batch in self._batches(match_ids):
+                placeholders = ','.join('?' * len(batch))
+                found.update(row[0] for row in conn.execute(f'SELECT match_id FROM matches WHERE match_id IN ({placeholders})', batch))
+        return found
+
+    def participant_stats(self, match_ids: Iterable[str], account_ids: Iterable[str]) -> Dict[str, Dict[str, Dict[str, float | int]]]:
+        """
+        Estatísticas das contas nas partidas já gravadas, no mesmo formato do
+        extract_players_stats_from_match: {match_id: {account_id: {"dano", "kills", "assists"}}}.
+        """
+        match_ids, account_ids = list(match_ids), list(account_ids)
+        result: Dict[str, Dict[str, Dict[str, float | int]]] = {}
+        if not match_ids or not account_ids:
+            return result
+        account_placeholders = ','.join('?' * len(account_ids))
+        with self._conn_lock:
+            conn = self._connect()
+            for batch in self._batches(match_ids):
+                query = (
+                    'SELECT match_id, account_id, damage, kills, assists FROM participants '
+                    f'WHERE match_id IN ({",".join("?" * len(batch))}) AND account_id IN ({account_placeholders})'
+                )
+                for match_id, account_id, damage, kills, assists in conn.execute(query, [*batch, *account_ids]):
+                    result.setdefault(match_id, {})[account_id] = {"dano": damage, "kills": kills, "assists": assists}
+        return result
+
+    async def store_matches_async(self, match_documents: List[Dict[str, Any]]) -> int:
+        return await asyncio.to_thread(self.store_matches, match_documents)
+
+    async def stored_match_ids_async(self, match_ids: Iterable[str]) -> Set[str]:
+        return await asyncio.to_thread(self.stored_match_ids, list(match_ids))
+
+    async def participant_stats_async(self, match_ids: Iterable[str], account_ids: Iterable[str]):
+        return await asyncio.to_thread(self.participant_stats, list(match_ids), list(account_ids))
+
+
+_match_store: Optional[MatchStore] = None
+
+
+def get_match_store() -> MatchStore:
+    """Store do processo, no caminho de PUBG_MATCH_STORE_DB (ou pubg_matches.db)."""
+    global _match_store
+    if _match_store is None:
+        _match_store = MatchStore(os.getenv(MATCH_STORE_DB_ENV) or DEFAULT_MATCH_STORE_DB)
+    return _match_store
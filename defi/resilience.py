@@ -0,0 +1,291 @@
+import asyncio
+import logging
+import random
+import re
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import aiohttp
+
+from defi.cassette import get_cassette
+
+logger = logging.getLogger(__name__)
+
+# Status que indicam instabilidade do lado da API e valem uma nova tentativa
+RETRYABLE_STATUSES = {500, 502, 503, 504}
+
+
+class PubgApiError(Exception):
+    """
+    Falha ao falar com a API do PUBG. Diferente de "não encontrado" (que vira None),
+    indica que a API está instável, limitando ou rejeitando a requisição.
+    """
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+class CircuitOpenError(PubgApiError):
+    """O circuito do endpoint está aberto: a requisição falha sem tocar na rede."""
+    def __init__(self, endpoint: str, retry_in: float):
+        super().__init__(f"Circuito aberto para '{endpoint}' (nova tentativa em {retry_in:.1f}s).")
+        self.endpoint = endpoint
+        self.retry_in = retry_in
+
+
+class RetryPolicy:
+    def __init__(self, max_retries: int = 3, base_delay: float = 0.5, max_delay: float = 8.0,
+                 default_retry_after: float = 30.0, max_retry_after: float = 65.0):
+        """
+        Política de novas tentativas.
+        - max_retries: tentativas extras após a primeira (5xx, timeouts e 429).
+        - base_delay/max_delay: limites do backoff exponencial com jitter.
+        - default_retry_after: espera usada num 429 sem cabeçalho de reset.
+        - max_retry_after: acima disso o 429 é repassado em vez de esperado.
+        """
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.default_retry_after = default_retry_after
+        self.max_retry_after = max_retry_after
+
+    def backoff(self, attempt: int) -> float:
+        """Backoff exponencial com "full jitter" para a tentativa `attempt` (começando em 0)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def retry_after(self, headers) -> float:
+        """Tempo exigido pela API num 429: Retry-After, senão X-Ratelimit-Reset, senão o padrão."""
+        value = headers.get('Retry-After')
+        if value:
+            try:
+                return max(0.0, float(value))
+            except ValueError:
+                pass
+        reset = headers.get('X-Ratelimit-Reset')
+        if reset:
+            try:
+                return max(0.0, float(reset) - time.time())
+            except ValueError:
+                pass
+        return self.default_retry_after
+
+
+# Passe das requisições com o circuito fechado; a de teste do half-open recebe um passe próprio
+_CLOSED_PERMIT = object()
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        Disjuntor de um endpoint. Após `failure_threshold` falhas seguidas abre por
+        `reset_timeout` segundos; depois deixa passar uma única requisição de teste.
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe: Optional[object] = None
+
+    @property
+    def rejecting(self) -> bool:
+        """Se allow_request() recusaria agora, sem reservar nada (para falhar antes de entrar na fila)."""
+        if self.state == self.OPEN:
+            return time.monotonic() - self.opened_at < self.reset_timeout
+        return self.state == self.HALF_OPEN and self._probe is not None
+
+    def allow_request(self) -> Optional[object]:
+        """
+        None se o circuito recusar; senão um passe a devolver em record_success,
+        record_failure ou release_probe. Só o passe da requisição de teste libera a
+        vaga do half-open, então quem nunca a teve não libera a de outro.
+        """
+        if self.state == self.CLOSED:
+            return _CLOSED_PERMIT
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return None
+            self.state = self.HALF_OPEN
+            self._probe = None
+        # HALF_OPEN: apenas uma requisição de teste por vez
+        if self._probe is not None:
+            return None
+        self._probe = object()
+        return self._probe
+
+    def retry_in(self) -> float:
+        if self.state != self.OPEN:
+            return 0.0
+        return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def record_success(self, permit: Optional[object] = None):
+        if self.state != self.CLOSED:
+            logger.info(f"Circuito '{self.name}' fechado novamente.")
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probe = None
+
+    def release_probe(self, permit: Optional[object]):
+        """Libera a vaga de teste sem registrar resultado (ex.: requisição cancelada), se `permit` for dela."""
+        if permit is not None and permit is self._probe:
+            self._probe = None
+
+    def record_failure(self, permit: Optional[object] = None):
+        self.failures += 1
+        self.release_probe(permit)
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning(f"Circuito '{self.name}' aberto após {self.failures} falhas. Falhando rápido por {self.reset_timeout:.0f}s.")
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+
+DEFAULT_RETRY_POLICY = RetryPolicy()
+
+# Um disjuntor por endpoint, compartilhado por todas as cogs do processo
+circuit_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def endpoint_name(url: str) -> str:
+    """
+    Reduz uma URL da API ao "endpoint" usado como chave do disjuntor,
+    ex.: '.../shards/steam/players/account.x/seasons/y/ranked' -> 'steam/players/ranked'.
+    """
+    match = re.search(r'/shards/([^/]+)/([^/?]+)', url)
+    if not match:
+        return url.split('?')[0]
+    shard, resource = match.groups()
+    path = url.split('?')[0]
+    if path.endswith('/ranked'):
+        return f"{shard}/{resource}/ranked"
+    return f"{shard}/{resource}"
+
+
+def get_circuit_breaker(endpoint: str) -> CircuitBreaker:
+    breaker = circuit_breakers.get(endpoint)
+    if breaker is None:
+        breaker = circuit_breakers[endpoint] = CircuitBreaker(endpoint)
+    return breaker
+
+
+async def _send(session: aiohttp.ClientSession, url: str, headers: dict) -> Tuple[int, Any, Any]:
+    # Com PUBG_CASSETTE_MODE definido as respostas são gravadas numa fita ou servidas dela
+    cassette = get_cassette()
+    if cassette is not None and cassette.replaying:
+        return await cassette.play(url)
+
+    started = time.monotonic()
+    async with session.get(url, headers=headers) as response:
+        if response.status == 200:
+            payload = await response.json()
+        else:
+            payload = await response.text()
+        if cassette is not None:
+            # Gravar é acessório: um erro de disco não pode descartar uma resposta válida
+            try:
+                await cassette.record(url, response.status, response.headers, payload, time.monotonic() - started)
+            except Exception as e:
+                logger.warning(f"Falha ao gravar a resposta de '{url}' na fita: {type(e).__name__} {e}")
+        return response.status, response.headers, payload
+
+
+async def request_json(session: aiohttp.ClientSession, url: str, headers: dict, limiter=None,
+                       policy: Optional[RetryPolicy] = None, deadline: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """
+    GET resiliente na API do PUBG.
+    Retorna o JSON da resposta, ou None para 404. Refaz 5xx e timeouts com backoff
+    exponencial com jitter, respeita o Retry-After dos 429 e falha rápido com
+    CircuitOpenError enquanto o endpoint estiver degradado. Demais falhas viram PubgApiError.
+    Se `limiter` for informado, cada tentativa consome um token dele.
+    `deadline` (instante de time.monotonic(); por padrão o prazo da faixa do escalonador,
+    se o limiter tiver um) limita também as esperas entre tentativas: uma espera que
+    passaria do prazo vira PubgApiError na hora.
+    """
+    policy = policy or DEFAULT_RETRY_POLICY
+    breaker = get_circuit_breaker(endpoint_name(url))
+    attempt = 0
+    if deadline is None:
+        deadline = getattr(limiter, 'deadline', None)
+
+    def fits(wait: float) -> bool:
+        return deadline is None or time.monotonic() + wait <= deadline
+
+    def admit() -> object:
+        permit = breaker.allow_request()
+        if permit is None:
+            raise CircuitOpenError(breaker.name, breaker.retry_in())
+        return permit
+
+    while True:
+        # Com o circuito recusando, falha antes de esperar na fila do escalonador
+        if breaker.rejecting:
+            raise CircuitOpenError(breaker.name, breaker.retry_in())
+
+        # O passe só é pedido depois do token: a vaga de teste do half-open não fica
+        # reservada enquanto a requisição espera na fila
+        permit = None
+        try:
+            if limiter is not None:
+                async with limiter:
+                    permit = admit()
+                    status, response_headers, payload = await _send(session, url, headers)
+            else:
+                permit = admit()
+                status, response_headers, payload = await _send(session, url, headers)
+        except (asyncio.TimeoutError, aiohttp.ClientConnectionError, aiohttp.ClientPayloadError) as e:
+            breaker.record_failure(permit)
+            delay = policy.backoff(attempt)
+            if attempt >= policy.max_retries or not fits(delay):
+                raise PubgApiError(f"Falha de conexão em '{breaker.name}' após {attempt + 1} tentativas: {type(e).__name__} {e}") from e
+            logger.warning(f"Falha de conexão em '{breaker.name}' ({type(e).__name__}). Tentativa {attempt + 1}/{policy.max_retries}, aguardando {delay:.2f}s.")
+            attempt += 1
+            await asyncio.sleep(delay)
+            continue
+        except (aiohttp.ClientError, ValueError) as e:
+            # Content-Type errado, corpo truncado (JSONDecodeError), URL inválida...
+            breaker.record_failure(permit)
+            raise PubgApiError(f"Resposta inesperada em '{breaker.name}': {type(e).__name__} {e}") from e
+        except BaseException:
+            # Cancelamento, prazo do escalonador ou qualquer outra exceção: libera a vaga de
+            # teste do half-open se esta tentativa a tinha, senão o endpoint fica preso em
+            # CircuitOpenError até reiniciar o processo
+            breaker.release_probe(permit)
+            raise
+
+        if status == 200:
+            breaker.record_success(permit)
+            return payload
+
+        if status == 404:
+            breaker.record_success(permit)
+            return None
+
+        if status == 429:
+            # A API respondeu: limite de taxa não é sinal de degradação
+            breaker.record_success(permit)
+            wait = policy.retry_after(response_headers)
+            if attempt >= policy.max_retries or wait > policy.max_retry_after or not fits(wait):
+                raise PubgApiError(f"Rate limit em '{breaker.name}' (Retry-After: {wait:.0f}s).", status=status)
+            logger.warning(f"Rate limit em '{breaker.name}'. Respeitando Retry-After de {wait:.0f}s.")
+            attempt += 1
+            await asyncio.sleep(wait)
+            continue
+
+        if status in RETRYABLE_STATUSES:
+            breaker.record_failure(permit)
+            delay = policy.backoff(attempt)
+            if attempt >= policy.max_retries or not fits(delay):
+                raise PubgApiError(f"Erro {status} em '{breaker.name}' após {attempt + 1} tentativas.", status=status)
+            logger.warning(f"Erro {status} em '{breaker.name}'. Tentativa {attempt + 1}/{policy.max_retries}, aguardando {delay:.2f}s.")
+            attempt += 1
+            await asyncio.sleep(delay)
+            continue
+
+        # Demais 4xx (chave inválida, requisição malformada): não adianta repetir
+        breaker.record_success(permit)
+        raise PubgApiError(f"Erro {status} em '{breaker.name}': {str(payload)[:200]}", status=status)
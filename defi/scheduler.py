@@ -0,0 +1,187 @@
+import asyncio
+import itertools
+import logging
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+from defi.resilience import PubgApiError
+from defi.shared_rate_limiter import create_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+# Faixas de prioridade: menor número é atendido primeiro
+INTERACTIVE = 0
+PREFETCH = 1
+BACKGROUND = 2
+
+LANE_NAMES = {INTERACTIVE: "interativa", PREFETCH: "prefetch", BACKGROUND: "background"}
+
+# Cota de cada chave da API do PUBG: KEY_RATE requisições a cada KEY_PERIOD_SECONDS
+KEY_RATE = 10
+KEY_PERIOD_SECONDS = 60
+
+# Se o limitador falhar (ex.: "database is locked" no SQLite compartilhado), o despachante
+# tenta de novo com backoff exponencial em vez de morrer e deixar a fila parada
+LIMITER_RETRY_BASE_DELAY = 0.5
+LIMITER_RETRY_MAX_DELAY = 10.0
+
+
+class DeadlineExceededError(PubgApiError):
+    """O prazo da requisição interativa venceu antes de ela conseguir um token."""
+
+
+class _Waiter:
+    __slots__ = ("priority", "deadline", "enqueued_at", "seq", "future")
+
+    def __init__(self, priority: int, deadline: Optional[float], seq: int, future: asyncio.Future):
+        self.priority = priority
+        self.deadline = deadline
+        self.enqueued_at = time.monotonic()
+        self.seq = seq
+        self.future = future
+
+
+class _LaneSlot:
+    def __init__(self, scheduler: "PriorityRequestScheduler", priority: int, deadline: Optional[float]):
+        self.scheduler = scheduler
+        self.priority = priority
+        self.deadline = deadline
+
+    async def __aenter__(self):
+        await self.scheduler.acquire(self.priority, self.deadline)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+
+class PriorityRequestScheduler:
+    def __init__(self, limiter, aging_seconds: float = 30.0, capacity: int = KEY_RATE, window: float = KEY_PERIOD_SECONDS):
+        """
+        Distribui os tokens do limitador de uma chave entre as faixas de prioridade.
+        A cada token liberado atende o waiter de menor prioridade efetiva; entre
+        interativos, o de prazo mais próximo. O envelhecimento (uma faixa a cada
+        `aging_seconds` de espera) garante que o refresh em background termine
+        mesmo com tráfego interativo constante.
+        `capacity`/`window` descrevem o bucket da chave, para estimar a folga em headroom().
+        """
+        self.limiter = limiter
+        self.aging_seconds = aging_seconds
+        self.capacity = capacity
+        self.window = window
+        self._granted = deque()
+        self._waiters: List[_Waiter] = []
+        self._seq = itertools.count()
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._spare_token = False
+
+    def lane(self, priority: int, deadline: Optional[float] = None) -> _LaneSlot:
+        """
+        Limitador para `async with` (mesma interface do AsyncRateLimiter) preso a uma faixa.
+        `deadline` é um instante de time.monotonic().
+        """
+        return _LaneSlot(self, priority, deadline)
+
+    def interactive(self, timeout: float) -> _LaneSlot:
+        return self.lane(INTERACTIVE, deadline=time.monotonic() + timeout)
+
+    @property
+    def queued(self) -> Dict[str, int]:
+        counts = {name: 0 for name in LANE_NAMES.values()}
+        for waiter in self._waiters:
+            counts[LANE_NAMES.get(waiter.priority, str(waiter.priority))] += 1
+        return counts
+
+    def headroom(self) -> float:
+        """
+        Estimativa dos tokens ainda no bucket: a capacidade menos os tokens que este
+        processo retirou na última janela de reposição. Não enxerga o consumo de outros
+        shards no bucket compartilhado, então é um teto otimista.
+        """
+        cutoff = time.monotonic() - self.window
+        while self._granted and self._granted[0] < cutoff:
+            self._granted.popleft()
+        return self.capacity - len(self._granted)
+
+    def _effective_priority(self, waiter: _Waiter, now: float):
+        aged = waiter.priority - (now - waiter.enqueued_at) / self.aging_seconds
+        return (aged, waiter.deadline if waiter.deadline is not None else float('inf'), waiter.seq)
+
+    def _pick(self) -> Optional[_Waiter]:
+        now = time.monotonic()
+        best = None
+        best_key = None
+        for waiter in self._waiters:
+            if waiter.future.done():
+                continue
+            key = self._effective_priority(waiter, now)
+            if best_key is None or key < best_key:
+                best, best_key = waiter, key
+        if best is not None:
+            self._waiters.remove(best)
+        return best
+
+    def _ensure_dispatcher(self):
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+
+    async def _dispatch(self):
+        failures = 0
+        while True:
+            self._waiters = [waiter for waiter in self._waiters if not waiter.future.done()]
+            if not self._waiters:
+                return
+            if not self._spare_token:
+                try:
+                    async with self.limiter:
+                        pass
+                except Exception as e:
+                    failures += 1
+                    delay = min(LIMITER_RETRY_MAX_DELAY, LIMITER_RETRY_BASE_DELAY * 2 ** (failures - 1))
+                    logger.error(f"Erro ao obter token do limitador: {type(e).__name__} {e}. Nova tentativa em {delay:.1f}s ({len(self._waiters)} na fila).")
+                    await asyncio.sleep(delay)
+                    continue
+                failures = 0
+                self._granted.append(time.monotonic())
+            waiter = self._pick()
+            if waiter is None:
+                # Todos desistiram enquanto o token era obtido: guarda para o próximo
+                self._spare_token = True
+                continue
+            self._spare_token = False
+            waiter.future.set_result(None)
+
+    async def acquire(self, priority: int = INTERACTIVE, deadline: Optional[float] = None):
+        loop = asyncio.get_running_loop()
+        waiter = _Waiter(priority, deadline, next(self._seq), loop.create_future())
+        self._waiters.append(waiter)
+        self._ensure_dispatcher()
+
+        timeout = None if deadline is None else deadline - time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout=timeout)
+        except asyncio.TimeoutError:
+            if waiter.future.done():
+                return
+            waiter.future.cancel()
+            raise DeadlineExceededError(f"Prazo da requisição esgotado na fila ({LANE_NAMES.get(priority, priority)}).")
+        except asyncio.CancelledError:
+            if not waiter.future.done():
+                waiter.future.cancel()
+            raise
+
+
+def get_key_scheduler(bot, api_key: str) -> PriorityRequestScheduler:
+    """
+    Escalonador da chave, compartilhado por todas as cogs através do bot
+    (como o bot.http_session), para que o /versus e o refresh do leaderboard
+    disputem o mesmo orçamento de tokens.
+    """
+    schedulers = getattr(bot, 'pubg_key_schedulers', None)
+    if schedulers is None:
+        schedulers = bot.pubg_key_schedulers = {}
+    scheduler = schedulers.get(api_key)
+    if scheduler is None:
+        scheduler = schedulers[api_key] = PriorityRequestScheduler(create_rate_limiter(api_key, rate=KEY_RATE, per_second=KEY_PERIOD_SECONDS))
+    return scheduler
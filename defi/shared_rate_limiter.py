@@ -0,0 +1,105 @@
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from defi.rate_limiter import AsyncRateLimiter
+
+logger = logging.getLogger(__name__)
+
+# Se definido, todos os processos do host dividem os buckets gravados neste SQLite
+SHARED_RATE_LIMIT_DB_ENV = 'PUBG_SHARED_RATE_LIMIT_DB'
+
+
+class SharedRateLimiter:
+    def __init__(self, db_path: str, bucket_key: str, rate: int = 10, per_second: int = 60):
+        """
+        Token bucket compartilhado entre processos do mesmo host, guardado numa tabela
+        SQLite. Cada retirada é uma transação BEGIN IMMEDIATE (lock de escrita do arquivo),
+        então todos os shards enxergam o mesmo saldo por chave.
+        Mesma interface do AsyncRateLimiter: `async with limiter: ...`.
+        """
+        self.db_path = db_path
+        self.bucket_key = bucket_key
+        self.capacity = float(rate)
+        self.refill_per_second = rate / per_second
+        self._conn = None
+        self._conn_lock = threading.Lock()
+        # Um único waiter por processo consulta o banco por vez; os demais fazem fila aqui
+        self._local_lock = asyncio.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS token_buckets ('
+                'bucket_key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)'
+            )
+            self._conn = conn
+        return self._conn
+
+    def _try_take(self) -> float:
+        """Tenta retirar um token. Retorna 0 se conseguiu, senão quantos segundos esperar."""
+        with self._conn_lock:
+            conn = self._connect()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                now = time.time()
+                row = conn.execute(
+                    'SELECT tokens, updated_at FROM token_buckets WHERE bucket_key = ?', (self.bucket_key,)
+                ).fetchone()
+                if row is None:
+                    tokens = self.capacity
+                else:
+                    tokens, updated_at = row
+                    tokens = min(self.capacity, tokens + max(0.0, now - updated_at) * self.refill_per_second)
+
+                if tokens >= 1:
+                    tokens -= 1
+                    wait = 0.0
+                else:
+                    wait = (1 - tokens) / self.refill_per_second
+
+                conn.execute(
+                    'INSERT INTO token_buckets (bucket_key, tokens, updated_at) VALUES (?, ?, ?) '
+                    'ON CONFLICT(bucket_key) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at',
+                    (self.bucket_key, tokens, now)
+                )
+                conn.execute('COMMIT')
+                return wait
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+
+    async def acquire(self):
+        async with self._local_lock:
+            while True:
+                wait = await asyncio.to_thread(self._try_take)
+                if wait <= 0:
+                    return
+                await asyncio.sleep(wait)
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+
+def create_rate_limiter(api_key: str, rate: int = 10, per_second: int = 60):
+    """
+    Limitador para uma chave da API. Com PUBG_SHARED_RATE_LIMIT_DB definido usa o
+    bucket compartilhado entre processos; senão, o AsyncRateLimiter em memória.
+    O nome do bucket é um hash da chave, para não gravar a chave em disco.
+    """
+    db_path = os.getenv(SHARED_RATE_LIMIT_DB_ENV)
+    if not db_path:
+        return AsyncRateLimiter(rate=rate, per_second=per_second)
+    bucket_key = hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:16]
+    logger.debug(f"Usando token bucket compartilhado '{bucket_key}' em '{db_path}'.")
+    return SharedRateLimiter(db_path, bucket_key, rate=rate, per_second=per_second)
@@ -5,16 +5,23 @@ import aiohttp
 import asyncio
 import datetime
 import pytz
-import json
 import os
 import logging
 import re
+import struct
 from itertools import cycle
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
+from typing import Optional
 
-# IMPORTAÇÃO DO MÓDULO DE RATE LIMITER (Assumindo que está no mesmo local)
-from defi.rate_limiter import AsyncRateLimiter
+# IMPORTAÇÃO DO ESCALONADOR POR CHAVE (envolve o rate limiter; Assumindo que está no mesmo local)
+from defi.scheduler import get_key_scheduler, BACKGROUND
+from defi.http_pool import acquire_pubg_session, release_pubg_session
+from defi.resilience import request_json, PubgApiError
 from defi.checks import is_rank_channel_check
+from defi.leaderboard_snapshot import SnapshotReader, SnapshotWriterLock, write_snapshot
+from defi.leaderboard_stats import compute_leaderboard_stats
+from defi.leaderboard_diff import compute_snapshot_diff, index_snapshot
+from defi.json_file import load_json, save_json
 
 # Importação da biblioteca Pillow
 from PIL import Image, ImageDraw, ImageFont, ImageFilter
@@ -22,9 +29,73 @@ import io
 
 logger = logging.getLogger(__name__)
 
+# Jogadores por página do /leaderboard (o layout da imagem tem 5 posições)
+LEADERBOARD_PAGE_SIZE = 5
+# Páginas renderizadas mantidas em memória, por (tier, página, geração do snapshot)
+LEADERBOARD_PAGE_CACHE_SIZE = 64
+
+
+class LeaderboardPaginator(discord.ui.View):
+    def __init__(self, cog: "Leaderboard", tier: str, total_pages: int, owner_id: int):
+        """Botões de navegação entre as páginas de um tier do leaderboard."""
+        super().__init__(timeout=300)
+        self.cog = cog
+        self.tier = tier
+        self.page = 0
+        self.total_pages = total_pages
+        self.owner_id = owner_id
+        self.message = None
+        self._update_buttons()
+
+    def _update_buttons(self):
+        self.previous_page.disabled = self.page <= 0
+        self.next_page.disabled = self.page >= self.total_pages - 1
+        self.page_counter.label = f"{self.page + 1}/{self.total_pages}"
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.owner_id:
+            await interaction.response.send_message("❌ Só quem usou o comando pode mudar a página. Use `/leaderboard` para abrir o seu.", ephemeral=True)
+            return False
+        return True
+
+    async def _show_page(self, interaction: discord.Interaction, page: int):
+        await interaction.response.defer()
+        image_bytes, total_pages = await self.cog.get_leaderboard_page(self.tier, page)
+        if image_bytes is None:
+            await interaction.followup.send("❌ Ocorreu um erro ao gerar esta página do leaderboard.", ephemeral=True)
+            return
+        # O snapshot pode ter mudado desde a última página; recalcula os limites
+        self.total_pages = total_pages
+        self.page = min(page, total_pages - 1)
+        self._update_buttons()
+        file = discord.File(io.BytesIO(image_bytes), filename=f"leaderboard_{self.tier}_{self.page + 1}.png")
+        await interaction.edit_original_response(attachments=[file], view=self)
+        self.cog.prefetch_leaderboard_page(self.tier, self.page + 1)
+
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show_page(interaction, self.page - 1)
+
+    @discord.ui.button(label="1/1", style=discord.ButtonStyle.secondary, disabled=True)
+    async def page_counter(self, interaction: discord.Interaction, button: discord.ui.Button):
+        pass
+
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show_page(interaction, self.page + 1)
+
+    async def on_timeout(self):
+        if self.message:
+            try:
+                await self.message.edit(view=None)
+            except discord.HTTPException:
+                pass
+
+
 class Leaderboard(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.http_session = None
         
         self.pubg_api_keys_with_names = [] 
         main_key_value = os.getenv('PUBG_API_KEY')
@@ -44,18 +115,21 @@ class Leaderboard(commands.Cog):
             self.current_api_key_iterator = None
             self.pubg_api_key = None
             self.pubg_api_key_name = None
-            self.api_key_limiters = {} 
+            self.api_key_schedulers = {}
+            self.active_api_scheduler = None
         else:
             self.current_api_key_iterator = cycle(self.pubg_api_keys_with_names)
             self.pubg_api_key_name, self.pubg_api_key = next(self.current_api_key_iterator) 
             logger.info(f"Carregadas {len(self.pubg_api_keys_with_names)} chaves de API do PUBG para Leaderboard. Iniciando com {self.pubg_api_key_name}.")
             
-            self.api_key_limiters = {
-                key_value: AsyncRateLimiter(rate=10, per_second=60)
+            # Escalonadores compartilhados com as outras cogs: o refresh usa a faixa BACKGROUND
+            # e só consome os tokens que os comandos interativos deixam livres
+            self.api_key_schedulers = {
+                key_value: get_key_scheduler(bot, key_value)
                 for key_name, key_value in self.pubg_api_keys_with_names
             }
-            self.active_api_rate_limiter = self.api_key_limiters[self.pubg_api_key]
-            logger.info(f"Inicializados {len(self.api_key_limiters)} limitadores de taxa, um para cada chave para Leaderboard.")
+            self.active_api_scheduler = self.api_key_schedulers[self.pubg_api_key]
+            logger.info(f"Inicializados {len(self.api_key_schedulers)} escalonadores de requisições, um para cada chave para Leaderboard.")
 
         self.base_url = "https://api.pubg.com/shards/steam"
         
@@ -63,8 +137,25 @@ class Leaderboard(commands.Cog):
             "Authorization": f"Bearer {self.pubg_api_key}",
             "Accept": "application/vnd.api+json"
         }
-        
-        self.json_file_path = 'leaderboard_pubg_sa.json'
+
+        # Vários shards no mesmo host: só o processo que detém o lock busca na API;
+        # todos leem o snapshot binário via mmap.
+        self.snapshot_path = 'leaderboard_pubg_sa.snapshot'
+        self.snapshot_lock = SnapshotWriterLock(f"{self.snapshot_path}.lock")
+        self.snapshot_reader = SnapshotReader(self.snapshot_path)
+
+        # Estatísticas por tier calculadas pelo escritor a cada atualização e servidas pelo /cutoffs
+        self.stats_path = 'leaderboard_pubg_sa_stats.json'
+        self.leaderboard_stats = None
+
+        # Variação entre gerações consecutivas (por Account ID), também calculada só pelo escritor.
+        # Jogadores com grande variação são anunciados no evento 'leaderboard_big_movers'.
+        self.diff_path = 'leaderboard_pubg_sa_diff.json'
+        self.leaderboard_diff = None
+
+        # Páginas do /leaderboard renderizadas sob demanda; a geração na chave invalida tudo a cada refresh
+        self.page_cache: "OrderedDict[tuple, bytes]" = OrderedDict()
+        self.page_render_tasks = {}
         
         self.all_tiers = ["Survivor", "Master", "Diamond", "Crystal", "Platinum", "Gold", "Silver", "Bronze"] 
 
@@ -81,6 +172,8 @@ class Leaderboard(commands.Cog):
         
         self.background_image_path = 'compare/leaderboard.png'
         self.font_path = 'fonts/pubgsans.ttf'
+        self.up_arrow_path = 'icons/up.png'
+        self.down_arrow_path = 'icons/down.png'
 
         try:
             self.pubg_font_regular = ImageFont.truetype(self.font_path, 40)
@@ -92,6 +185,8 @@ class Leaderboard(commands.Cog):
             self.pubg_font_small = ImageFont.load_default()
         
     async def cog_load(self):
+        # Sessão dedicada ao PUBG, compartilhada com as outras cogs do PUBG
+        self.http_session = acquire_pubg_session(self.bot)
         if self.pubg_api_keys_with_names:
             logger.info("Leaderboard Cog: Iniciando loops de atualização.")
             self.hourly_leaderboard_update.start()
@@ -102,18 +197,20 @@ class Leaderboard(commands.Cog):
         logger.info("Leaderboard Cog: Cancelando loops de atualização.")
         self.daily_leaderboard_update.cancel()
         self.hourly_leaderboard_update.cancel()
+        self.snapshot_lock.release()
+        await release_pubg_session(self.bot)
 
     async def _update_api_key_and_headers(self):
-        """Atualiza a chave da API e o limitador de taxa ativo."""
+        """Atualiza a chave da API e o escalonador de requisições ativo."""
         if self.current_api_key_iterator:
             self.pubg_api_key_name, self.pubg_api_key = next(self.current_api_key_iterator)
             self.headers["Authorization"] = f"Bearer {self.pubg_api_key}"
-            self.active_api_rate_limiter = self.api_key_limiters[self.pubg_api_key]
+            self.active_api_scheduler = self.api_key_schedulers[self.pubg_api_key]
             logger.debug(f"Usando PUBG API Key para Leaderboard: {self.pubg_api_key_name}")
         else:
             logger.error("Tentativa de atualizar a API Key para Leaderboard sem um iterador de chaves válido.")
             self.headers["Authorization"] = "Bearer INVALID_KEY" 
-            self.active_api_rate_limiter = None 
+            self.active_api_scheduler = None
             self.pubg_api_key_name = "N/A"
 
     @tasks.loop(hours=24)
@@ -121,7 +218,7 @@ class Leaderboard(commands.Cog):
         now = datetime.datetime.now(pytz.timezone('America/Sao_Paulo'))
         logger.info(f"Iniciando atualização diária do leaderboard às {now.strftime('%H:%M:%S')}")
         
-        await self.fetch_and_save_leaderboard_json(self.bot.http_session)
+        await self.fetch_and_save_leaderboard_json(self.http_session)
         logger.info("Atualização diária do leaderboard concluída.")
 
     @daily_leaderboard_update.before_loop
@@ -129,7 +226,7 @@ class Leaderboard(commands.Cog):
         await self.bot.wait_until_ready()
         
         logger.info("Leaderboard Cog: Executando busca inicial do leaderboard na inicialização do bot.")
-        await self.fetch_and_save_leaderboard_json(self.bot.http_session)
+        await self.fetch_and_save_leaderboard_json(self.http_session)
         logger.info("Leaderboard Cog: Busca inicial do leaderboard concluída.")
 
         now = datetime.datetime.now(pytz.timezone('America/Sao_Paulo'))
@@ -142,10 +239,14 @@ class Leaderboard(commands.Cog):
 
     @tasks.loop(hours=1)
     async def hourly_leaderboard_update(self):
+        if not self.snapshot_lock.try_acquire():
+            logger.info("Leaderboard Cog: Outro processo é o escritor do snapshot. Pulando a busca na API.")
+            return
+
         now = datetime.datetime.now(pytz.timezone('America/Sao_Paulo'))
         logger.info(f"Iniciando atualização horária do leaderboard às {now.strftime('%H:%M:%S')}")
         
-        await self.fetch_and_save_leaderboard_json(self.bot.http_session)
+        await self.fetch_and_save_leaderboard_json(self.http_session)
         logger.info("Atualização horária do leaderboard concluída.")
 
     @hourly_leaderboard_update.before_loop
@@ -154,11 +255,11 @@ class Leaderboard(commands.Cog):
         logger.info("Leaderboard Cog: Loop de atualização horária pronto para iniciar.")
 
     async def fetch_and_save_leaderboard_json(self, session, expected_season_number: int = None):
-        if not self.pubg_api_key or self.active_api_rate_limiter is None:
+        if not self.pubg_api_key or self.active_api_scheduler is None:
             logger.error("Não há PUBG API Key ativa ou limitador de taxa para buscar o leaderboard completo.")
             return False
 
-        logger.info(f"Iniciando busca do leaderboard completo para salvamento em JSON.")
+        logger.info("Iniciando busca do leaderboard completo para atualizar o snapshot.")
 
         if session is None or session.closed:
             logger.error("aiohttp session não disponível ou fechada para busca de leaderboard completo.")
@@ -169,10 +270,7 @@ class Leaderboard(commands.Cog):
             
             await self._update_api_key_and_headers()
             
-            async with self.active_api_rate_limiter:
-                current_season_id = await self.get_current_season(session, leaderboard_base_url, expected_season_number)
-            
-            await asyncio.sleep(1)
+            current_season_id = await self.get_current_season(session, leaderboard_base_url, expected_season_number)
 
             if not current_season_id:
                 logger.error("Não foi possível encontrar NENHUMA temporada ranqueada ativa para buscar o leaderboard completo.")
@@ -191,21 +289,19 @@ class Leaderboard(commands.Cog):
 
                 await self._update_api_key_and_headers()
                 
-                async with self.active_api_rate_limiter:
-                    async with session.get(leaderboard_url, headers=self.headers) as response:
-                        if response.status == 200:
-                            leaderboard_data = await response.json()
-                            all_leaderboard_data[modo_value] = leaderboard_data
-                            logger.info(f"Resposta completa do leaderboard para modo {modo_value} obtida (Temporada: {season_display_number}).")
-                        elif response.status == 429:
-                            retry_after = int(response.headers.get('Retry-After', 30))
-                            logger.warning(f"Rate limit atingido ao buscar leaderboard completo para modo {modo_value} (KEY: {self.pubg_api_key_name}). Esperando {retry_after}s. Isso pode atrasar o processo.")
-                            await asyncio.sleep(retry_after + 1)
-                            continue 
-                        else:
-                            logger.error(f"Erro ao acessar o leaderboard completo para modo {modo_value}: Status {response.status} - {await response.text()} (KEY: {self.pubg_api_key_name}).")
-                
-                await asyncio.sleep(1)
+                # request_json refaz 5xx/timeouts com backoff e respeita o Retry-After dos 429
+                try:
+                    leaderboard_data = await request_json(session, leaderboard_url, self.headers, limiter=self.active_api_scheduler.lane(BACKGROUND))
+                except PubgApiError as e:
+                    logger.error(f"Erro ao acessar o leaderboard completo para modo {modo_value}: {e} (KEY: {self.pubg_api_key_name}).")
+                    continue
+
+                if leaderboard_data is None:
+                    logger.error(f"Leaderboard completo para modo {modo_value} não encontrado (Temporada: {season_display_number}).")
+                    continue
+
+                all_leaderboard_data[modo_value] = leaderboard_data
+                logger.info(f"Resposta completa do leaderboard para modo {modo_value} obtida (Temporada: {season_display_number}).")
 
         except aiohttp.ClientError as e:
             logger.error(f"Erro de conexão ao tentar buscar o leaderboard completo: {e}", exc_info=True)
@@ -214,17 +310,109 @@ class Leaderboard(commands.Cog):
             logger.error(f"Ocorreu um erro inesperado durante a busca de dados do leaderboard completo: {type(e).__name__} - {e}", exc_info=True)
             return False
 
-        try:
-            with open(self.json_file_path, 'w', encoding='utf-8') as jsonfile:
-                json.dump(all_leaderboard_data, jsonfile, ensure_ascii=False, indent=4)
-            logger.info(f"Dados completos do leaderboard salvos em '{self.json_file_path}'.")
+        if not all_leaderboard_data:
+            logger.error("Nenhum modo do leaderboard foi obtido. Mantendo o snapshot anterior.")
+            return False
+
+        valid_players = self._extract_valid_players(all_leaderboard_data.get('squad-fpp'))
+        if not valid_players:
+            logger.warning("Nenhum jogador válido no leaderboard 'squad-fpp'. Snapshot não atualizado.")
             return True
+
+        # A geração atual ainda está mapeada: indexa antes da troca para calcular a variação depois
+        self.snapshot_reader.refresh()
+        previous_generation = self.snapshot_reader.generation
+        previous_index = index_snapshot(self.snapshot_reader)
+
+        try:
+            generation = write_snapshot(self.snapshot_path, valid_players)
+            logger.info(f"Snapshot do leaderboard salvo em '{self.snapshot_path}' (geração {generation}, {len(valid_players)} jogadores).")
         except Exception as e:
-            logger.error(f"Erro ao salvar os dados completos do leaderboard no arquivo JSON: {e}", exc_info=True)
+            logger.error(f"Erro ao salvar o snapshot do leaderboard: {e}", exc_info=True)
             return False
 
+        try:
+            self.snapshot_reader.refresh()
+            stats = compute_leaderboard_stats(self.snapshot_reader, previous=load_json(self.stats_path, "estatísticas do leaderboard"))
+            save_json(self.stats_path, stats)
+            self.leaderboard_stats = stats
+            logger.info(f"Estatísticas do leaderboard salvas em '{self.stats_path}' (geração {stats['generation']}).")
+        except Exception as e:
+            logger.error(f"Erro ao calcular as estatísticas do leaderboard: {e}", exc_info=True)
+
+        if previous_index:
+            try:
+                diff = compute_snapshot_diff(previous_index, previous_generation, self.snapshot_reader)
+                save_json(self.diff_path, diff)
+                self.leaderboard_diff = diff
+                logger.info(
+                    f"Variação do leaderboard salva em '{self.diff_path}' (geração {previous_generation} -> {diff['generation']}): "
+                    f"{len(diff['promotions'])} promoções, {len(diff['demotions'])} rebaixamentos, "
+                    f"{len(diff['entries'])} entradas, {len(diff['exits'])} saídas."
+                )
+                if diff['big_movers']:
+                    # Outras cogs podem ouvir com @commands.Cog.listener() async def on_leaderboard_big_movers(movers, diff)
+                    self.bot.dispatch('leaderboard_big_movers', diff['big_movers'], diff)
+            except Exception as e:
+                logger.error(f"Erro ao calcular a variação do leaderboard: {e}", exc_info=True)
+        return True
+
+    def _get_leaderboard_stats(self):
+        """Estatísticas da geração atual do snapshot, relendo o arquivo só quando a geração muda."""
+        self.snapshot_reader.refresh()
+        if self.leaderboard_stats is None or self.leaderboard_stats.get('generation') != self.snapshot_reader.generation:
+            stats = load_json(self.stats_path, "estatísticas do leaderboard")
+            if stats:
+                self.leaderboard_stats = stats
+        return self.leaderboard_stats
+
+    def _get_leaderboard_diff(self):
+        """Variação da geração atual do snapshot, relendo o arquivo só quando a geração muda."""
+        if self.leaderboard_diff is None or self.leaderboard_diff.get('generation') != self.snapshot_reader.generation:
+            diff = load_json(self.diff_path, "variação do leaderboard")
+            if diff and diff.get('generation') == self.snapshot_reader.generation:
+                self.leaderboard_diff = diff
+            else:
+                return None
+        return self.leaderboard_diff
+
+    def _extract_valid_players(self, squad_fpp_data) -> list:
+        """
+        Extrai os jogadores com nome, rank, tier, subTier e rankPoints da resposta
+        do leaderboard da API.
+        """
+        if not squad_fpp_data or 'included' not in squad_fpp_data:
+            return []
+
+        valid_players = []
+        for item in squad_fpp_data['included']:
+            if item.get('type') == 'player' and 'attributes' in item:
+                attributes = item['attributes']
+                stats = attributes.get('stats')
+
+                player_name = attributes.get('name') 
+                player_rank = attributes.get('rank')
+                player_rank_points = stats.get('rankPoints') if stats else None 
+
+                player_tier = stats.get('tier') if stats else None
+                player_sub_tier = stats.get('subTier') if stats else None
+                
+                if player_name and player_rank is not None and \
+                   player_tier and player_sub_tier is not None and \
+                   player_rank_points is not None:
+                    
+                    valid_players.append({
+                        'id': item.get('id'),
+                        'name': player_name,
+                        'tier': player_tier,
+                        'subTier': player_sub_tier,
+                        'rank': player_rank,
+                        'rankPoints': player_rank_points
+                    })
+        return valid_players
+
     async def get_current_season(self, session, base_url: str, expected_season_number: int = None):
-        if not self.pubg_api_key or self.active_api_rate_limiter is None:
+        if not self.pubg_api_key or self.active_api_scheduler is None:
             logger.error("Não há PUBG API Key ativa ou limitador de taxa para obter a temporada atual (Leaderboard Cog).")
             return None
 
@@ -232,50 +420,50 @@ class Leaderboard(commands.Cog):
         try:
             seasons_url = f"{base_url}/seasons"
             
-            async with self.active_api_rate_limiter: 
-                async with session.get(seasons_url, headers=self.headers) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        all_seasons = data.get('data', [])
-                        
-                        if not all_seasons:
-                            logger.warning("Nenhuma temporada encontrada na API do PUBG (Leaderboard Cog).")
-                            return None
-
-                        for season in all_seasons:
-                            if season.get('attributes', {}).get('isCurrentSeason') is True:
-                                season_id = season['id']
-                                if re.search(r'division\.bro\.official\.pc-2018-\d+', season_id):
-                                    logger.info(f"Encontrada temporada atual (isCurrentSeason=True) para Leaderboard: {season_id}")
-                                    return season_id
-                                else:
-                                    logger.warning(f"Temporada atual '{season_id}' encontrada, mas com formato de ID inesperado para ranqueada. Ignorando (Leaderboard Cog).")
-
-                        if expected_season_number:
-                            for season in all_seasons:
-                                season_id = season['id']
-                                match = re.search(r'division\.bro\.official\.pc-2018-(\d+)', season_id)
-                                if match and int(match.group(1)) == expected_season_number:
-                                    logger.info(f"Encontrada temporada ranqueada esperada para Leaderboard: {season_id} (Número: {expected_season_number})")
-                                    return season_id
-
-                        ranked_like_seasons = []
-                        for season in all_seasons:
-                            season_id = season['id']
-                            if re.search(r'division\.bro\.official\.pc-2018-\d+', season_id):
-                                ranked_like_seasons.append(season)
-
-                        if ranked_like_seasons:
-                            ranked_like_seasons.sort(key=lambda s: int(re.search(r'(\d+)$', s['id']).group(1)) if re.search(r'(\d+)$', s['id']) else 0, reverse=True)
-                            most_recent_season_id = ranked_like_seasons[0]['id']
-                            logger.info(f"Retornando temporada ranqueada mais recente por padrão de ID para Leaderboard: {most_recent_season_id}")
-                            return most_recent_season_id
-
-                        logger.warning("Nenhuma temporada ranqueada ativa ou com padrão reconhecido encontrada na API do PUBG (Leaderboard Cog).")
-                        return None
+            data = await request_json(session, seasons_url, self.headers, limiter=self.active_api_scheduler.lane(BACKGROUND))
+            if data is None:
+                logger.error(f"Endpoint de temporadas não encontrado na API do PUBG para Leaderboard (KEY: {self.pubg_api_key_name}).")
+                return None
+            all_seasons = data.get('data', [])
+
+            if not all_seasons:
+                logger.warning("Nenhuma temporada encontrada na API do PUBG (Leaderboard Cog).")
+                return None
+
+            for season in all_seasons:
+                if season.get('attributes', {}).get('isCurrentSeason') is True:
+                    season_id = season['id']
+                    if re.search(r'division\.bro\.official\.pc-2018-\d+', season_id):
+                        logger.info(f"Encontrada temporada atual (isCurrentSeason=True) para Leaderboard: {season_id}")
+                        return season_id
                     else:
-                        logger.error(f"Erro ao obter temporadas da API do PUBG para Leaderboard: Status {response.status} - {await response.text()} (KEY: {self.pubg_api_key_name}).")
-                        return None
+                        logger.warning(f"Temporada atual '{season_id}' encontrada, mas com formato de ID inesperado para ranqueada. Ignorando (Leaderboard Cog).")
+
+            if expected_season_number:
+                for season in all_seasons:
+                    season_id = season['id']
+                    match = re.search(r'division\.bro\.official\.pc-2018-(\d+)', season_id)
+                    if match and int(match.group(1)) == expected_season_number:
+                        logger.info(f"Encontrada temporada ranqueada esperada para Leaderboard: {season_id} (Número: {expected_season_number})")
+                        return season_id
+
+            ranked_like_seasons = []
+            for season in all_seasons:
+                season_id = season['id']
+                if re.search(r'division\.bro\.official\.pc-2018-\d+', season_id):
+                    ranked_like_seasons.append(season)
+
+            if ranked_like_seasons:
+                ranked_like_seasons.sort(key=lambda s: int(re.search(r'(\d+)$', s['id']).group(1)) if re.search(r'(\d+)$', s['id']) else 0, reverse=True)
+                most_recent_season_id = ranked_like_seasons[0]['id']
+                logger.info(f"Retornando temporada ranqueada mais recente por padrão de ID para Leaderboard: {most_recent_season_id}")
+                return most_recent_season_id
+
+            logger.warning("Nenhuma temporada ranqueada ativa ou com padrão reconhecido encontrada na API do PUBG (Leaderboard Cog).")
+            return None
+        except PubgApiError as e:
+            logger.error(f"Erro ao obter temporadas da API do PUBG para Leaderboard: {e} (KEY: {self.pubg_api_key_name}).")
+            return None
         except aiohttp.ClientError as e:
             logger.error(f"Erro de conexão com a API do PUBG (get_current_season no Leaderboard Cog): {e}", exc_info=True)
             return None
@@ -303,11 +491,15 @@ class Leaderboard(commands.Cog):
 
         draw.text((x_pos, y), text, font=font, fill=color)
 
-    async def generate_leaderboard_image(self, selected_tier: str, top_players: list, last_updated: str) -> io.BytesIO:
+    async def generate_leaderboard_image(self, selected_tier: str, top_players: list, last_updated: str, title: Optional[str] = None) -> io.BytesIO:
         """
         Gera a imagem do leaderboard com os jogadores e informações.
         Retorna um io.BytesIO contendo a imagem.
+        O desenho e o PNG rodam numa thread para não travar o event loop (e o heartbeat do gateway).
         """
+        return await asyncio.to_thread(self._draw_leaderboard_image, selected_tier, top_players, last_updated, title)
+
+    def _draw_leaderboard_image(self, selected_tier: str, top_players: list, last_updated: str, title: Optional[str] = None) -> io.BytesIO:
         try:
             background = Image.open(self.background_image_path).convert("RGBA")
             draw = ImageDraw.Draw(background)
@@ -317,7 +509,7 @@ class Leaderboard(commands.Cog):
             # =================================================================
             
             # --- Configurações do Título ---
-            title_text = f"{selected_tier}"
+            title_text = title or f"{selected_tier}"
             title_x, title_y = background.width // 2, 100
             title_font_size = 100
             title_color = (255, 255, 255, 255) # Branco
@@ -378,6 +570,12 @@ class Leaderboard(commands.Cog):
             name_color = (255, 255, 0, 255) # Amarelo para nomes
             stats_color = (173, 216, 230, 255) # Azul claro para stats
 
+            # Setas de subida/descida no rank desde a atualização anterior (as mesmas do compare)
+            up_arrow_img = down_arrow_img = None
+            if os.path.exists(self.up_arrow_path) and os.path.exists(self.down_arrow_path):
+                up_arrow_img = Image.open(self.up_arrow_path).convert("RGBA")
+                down_arrow_img = Image.open(self.down_arrow_path).convert("RGBA")
+
             # --- Configurações do Rodapé ---
             footer_text = f"Última atualização: {last_updated}"
             footer_x, footer_y = background.width // 2, background.height - 50
@@ -421,6 +619,22 @@ class Leaderboard(commands.Cog):
                     centered=True
                 )
 
+                # Seta e variação de posições logo depois do texto de rank/pontos
+                rank_delta = player.get('rankDelta')
+                if rank_delta and up_arrow_img:
+                    arrow_img = up_arrow_img if rank_delta > 0 else down_arrow_img
+                    icon_size = config['stats_font_size']
+                    arrow_img = arrow_img.resize((icon_size, icon_size))
+                    try:
+                        stats_font = ImageFont.truetype(self.font_path, config['stats_font_size'])
+                    except IOError:
+                        stats_font = ImageFont.load_default()
+                    text_width = draw.textlength(rank_points_text, font=stats_font)
+                    arrow_x = int(config['x'] + text_width / 2 + 10)
+                    arrow_y = int(config['y'] + config['name_stats_spacing'])
+                    background.paste(arrow_img, (arrow_x, arrow_y), arrow_img)
+                    draw.text((arrow_x + icon_size + 5, arrow_y), f"{abs(rank_delta)}", font=stats_font, fill=stats_color)
+
             # Desenha o Rodapé
             self._draw_text_with_options(draw, footer_text, footer_x, footer_y, footer_font_size, footer_color, centered=True)
 
@@ -436,7 +650,62 @@ class Leaderboard(commands.Cog):
             logger.error(f"Erro ao gerar imagem do leaderboard: {e}", exc_info=True)
             return None
 
-    @app_commands.command(name="leaderboard", description="Mostra os 5 melhores jogadores de um Tier específico do leaderboard ranqueado do PUBG.")
+    def _leaderboard_page_count(self, tier: str) -> int:
+        rows = len(self.snapshot_reader.tier_rows(tier))
+        return max(1, -(-rows // LEADERBOARD_PAGE_SIZE))
+
+    async def _render_leaderboard_page(self, tier: str, page: int, generation: int, total_pages: int) -> Optional[bytes]:
+        rows = self.snapshot_reader.tier_rows(tier)[page * LEADERBOARD_PAGE_SIZE:(page + 1) * LEADERBOARD_PAGE_SIZE]
+        players = [self.snapshot_reader.player(i) for i in rows]
+        diff = self._get_leaderboard_diff()
+        if diff:
+            for player in players:
+                movement = diff['movement'].get(player['id'])
+                if movement:
+                    player['rankDelta'] = movement[0]
+        dt_object = datetime.datetime.fromtimestamp(self.snapshot_reader.created_at, tz=pytz.timezone('America/Sao_Paulo'))
+        title = tier if total_pages == 1 else f"{tier} {page + 1}/{total_pages}"
+        buffer = await self.generate_leaderboard_image(tier, players, dt_object.strftime('%d/%m/%Y %H:%M:%S'), title=title)
+        if buffer is None:
+            return None
+        image_bytes = buffer.getvalue()
+        self.page_cache[(tier, page, generation)] = image_bytes
+        while len(self.page_cache) > LEADERBOARD_PAGE_CACHE_SIZE:
+            self.page_cache.popitem(last=False)
+        return image_bytes
+
+    async def get_leaderboard_page(self, tier: str, page: int):
+        """
+        PNG de uma página do tier, renderizado na primeira vez que é pedido e depois
+        servido do cache. Pedidos simultâneos da mesma página (clique + prefetch)
+        compartilham a mesma renderização. Retorna (bytes ou None, total de páginas).
+        """
+        self.snapshot_reader.refresh()
+        generation = self.snapshot_reader.generation
+        total_pages = self._leaderboard_page_count(tier)
+        page = max(0, min(page, total_pages - 1))
+        key = (tier, page, generation)
+
+        if key in self.page_cache:
+            self.page_cache.move_to_end(key)
+            return self.page_cache[key], total_pages
+
+        task = self.page_render_tasks.get(key)
+        if task is None:
+            task = asyncio.create_task(self._render_leaderboard_page(tier, page, generation, total_pages))
+            self.page_render_tasks[key] = task
+            task.add_done_callback(lambda _: self.page_render_tasks.pop(key, None))
+        return await asyncio.shield(task), total_pages
+
+    def prefetch_leaderboard_page(self, tier: str, page: int):
+        """Renderiza a próxima página em background enquanto o usuário olha a atual."""
+        if page >= self._leaderboard_page_count(tier):
+            return
+        if (tier, page, self.snapshot_reader.generation) in self.page_cache:
+            return
+        asyncio.create_task(self.get_leaderboard_page(tier, page))
+
+    @app_commands.command(name="leaderboard", description="Mostra os jogadores de um Tier específico do leaderboard ranqueado do PUBG, com páginas.")
     @is_rank_channel_check
     @app_commands.choices(tier_selection=[
         app_commands.Choice(name="Survivor", value="Survivor"),
@@ -450,70 +719,28 @@ class Leaderboard(commands.Cog):
 
         selected_tier = tier_selection.value
 
-        if not os.path.exists(self.json_file_path):
-            embed = discord.Embed(
-                title="❌ Leaderboard Não Encontrado",
-                description="O arquivo do leaderboard não foi encontrado. Por favor, aguarde a primeira atualização ou tente novamente mais tarde.",
-                color=discord.Color.red()
-            )
-            await interaction.followup.send(embed=embed)
-            return
-
         try:
-            with open(self.json_file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            squad_fpp_data = data.get('squad-fpp')
-            if not squad_fpp_data or 'included' not in squad_fpp_data:
+            self.snapshot_reader.refresh()
+
+            if not self.snapshot_reader.available:
                 embed = discord.Embed(
-                    title="❌ Dados do Leaderboard Inválidos",
-                    description="O arquivo do leaderboard está vazio ou com formato inesperado para 'squad-fpp'.",
+                    title="❌ Leaderboard Não Encontrado",
+                    description="O arquivo do leaderboard não foi encontrado. Por favor, aguarde a primeira atualização ou tente novamente mais tarde.",
                     color=discord.Color.red()
                 )
                 await interaction.followup.send(embed=embed)
                 return
 
-            players_data_raw = squad_fpp_data['included']
-            
-            valid_players = []
-            for item in players_data_raw:
-                if item.get('type') == 'player' and 'attributes' in item:
-                    attributes = item['attributes']
-                    stats = attributes.get('stats')
-
-                    player_name = attributes.get('name') 
-                    player_rank = attributes.get('rank')
-                    player_rank_points = stats.get('rankPoints') if stats else None 
-
-                    player_tier = stats.get('tier') if stats else None
-                    player_sub_tier = stats.get('subTier') if stats else None
-                    
-                    if player_name and player_rank is not None and \
-                       player_tier and player_sub_tier is not None and \
-                       player_rank_points is not None:
-                        
-                        valid_players.append({
-                            'name': player_name,
-                            'tier': player_tier,
-                            'subTier': player_sub_tier,
-                            'rank': player_rank,
-                            'rankPoints': player_rank_points
-                        })
-            
-            if not valid_players:
+            if self.snapshot_reader.count == 0:
                 embed = discord.Embed(
                     title="⚠️ Nenhum Jogador Válido",
-                    description="Não foram encontrados jogadores válidos com dados de tier/rank no leaderboard. Verifique se o JSON contém os campos 'name', 'rank' (em 'attributes') e 'tier', 'subTier', 'rankPoints' (em 'attributes.stats') dos jogadores em 'included'.",
+                    description="Não foram encontrados jogadores válidos com dados de tier/rank no leaderboard.",
                     color=discord.Color.orange()
                 )
                 await interaction.followup.send(embed=embed)
                 return
 
-            selected_tier_players = [
-                player for player in valid_players if player['tier'] == selected_tier
-            ]
-
-            if not selected_tier_players:
+            if not self.snapshot_reader.tier_rows(selected_tier):
                 embed = discord.Embed(
                     title=f"⚠️ Nenhum Jogador Encontrado para o Tier {selected_tier}",
                     description="Não foram encontrados jogadores para este tier no leaderboard atualmente.",
@@ -522,21 +749,16 @@ class Leaderboard(commands.Cog):
                 await interaction.followup.send(embed=embed)
                 return
 
-            tier_players_sorted = sorted(selected_tier_players, key=lambda p: p['rank'])
-            
-            top_5_players = tier_players_sorted[:5]
-
-            last_modified_time = "N/A"
-            if os.path.exists(self.json_file_path):
-                timestamp = os.path.getmtime(self.json_file_path)
-                dt_object = datetime.datetime.fromtimestamp(timestamp, tz=pytz.timezone('America/Sao_Paulo'))
-                last_modified_time = dt_object.strftime('%d/%m/%Y %H:%M:%S')
-
-            leaderboard_image_buffer = await self.generate_leaderboard_image(selected_tier, top_5_players, last_modified_time)
+            image_bytes, total_pages = await self.get_leaderboard_page(selected_tier, 0)
 
-            if leaderboard_image_buffer:
-                file = discord.File(leaderboard_image_buffer, filename=f"leaderboard_{selected_tier}.png")
-                await interaction.followup.send(file=file)
+            if image_bytes:
+                file = discord.File(io.BytesIO(image_bytes), filename=f"leaderboard_{selected_tier}.png")
+                if total_pages > 1:
+                    view = LeaderboardPaginator(self, selected_tier, total_pages, interaction.user.id)
+                    view.message = await interaction.followup.send(file=file, view=view, wait=True)
+                    self.prefetch_leaderboard_page(selected_tier, 1)
+                else:
+                    await interaction.followup.send(file=file)
             else:
                 embed = discord.Embed(
                     title="❌ Erro ao Gerar Imagem",
@@ -549,13 +771,13 @@ class Leaderboard(commands.Cog):
         except FileNotFoundError:
             embed = discord.Embed(
                 title="❌ Erro de Arquivo",
-                description="O arquivo JSON do leaderboard não foi encontrado. Por favor, aguarde a atualização automática.",
+                description="O arquivo do leaderboard não foi encontrado. Por favor, aguarde a atualização automática.",
                 color=discord.Color.red()
             )
             await interaction.followup.send(embed=embed)
-        except json.JSONDecodeError:
+        except (struct.error, ValueError):
             embed = discord.Embed(
-                title="❌ Erro no JSON",
+                title="❌ Erro no Snapshot",
                 description="O arquivo do leaderboard está corrompido ou com formato inválido.",
                 color=discord.Color.red()
             )
@@ -570,5 +792,104 @@ class Leaderboard(commands.Cog):
             await interaction.followup.send(embed=embed)
 
 
+    @staticmethod
+    def _format_delta(value) -> str:
+        if not value:
+            return ""
+        return f" (▲{value:,})" if value > 0 else f" (▼{abs(value):,})"
+
+    @app_commands.command(name="cutoffs", description="Mostra as notas de corte, percentis e a distribuição por tier do leaderboard ranqueado do PUBG.")
+    @is_rank_channel_check
+    @app_commands.describe(tier_selection="Tier para detalhar (opcional)")
+    @app_commands.choices(tier_selection=[
+        app_commands.Choice(name="Survivor", value="Survivor"),
+        app_commands.Choice(name="Master", value="Master"),
+        app_commands.Choice(name="Diamond", value="Diamond"),
+        app_commands.Choice(name="Crystal", value="Crystal"),
+        app_commands.Choice(name="Platinum", value="Platinum"),
+    ])
+    async def cutoffs(self, interaction: discord.Interaction, tier_selection: Optional[app_commands.Choice[str]] = None):
+        stats = self._get_leaderboard_stats()
+        if not stats:
+            embed = discord.Embed(
+                title="❌ Estatísticas Não Encontradas",
+                description="As estatísticas do leaderboard ainda não foram calculadas. Por favor, aguarde a próxima atualização.",
+                color=discord.Color.red()
+            )
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
+
+        deltas = stats.get('deltas') or {}
+        updated_at = datetime.datetime.fromtimestamp(stats['created_at'], tz=pytz.timezone('America/Sao_Paulo')).strftime('%d/%m/%Y %H:%M:%S')
+
+        if tier_selection:
+            tier = tier_selection.value
+            tier_stats = stats['tiers'].get(tier)
+            if not tier_stats:
+                embed = discord.Embed(
+                    title=f"⚠️ Nenhum Jogador Encontrado para o Tier {tier}",
+                    description="Não foram encontrados jogadores para este tier no leaderboard atualmente.",
+                    color=discord.Color.orange()
+                )
+                await interaction.response.send_message(embed=embed, ephemeral=True)
+                return
+
+            embed = discord.Embed(
+                title=f"📊 Notas de Corte — {tier}",
+                description=f"**{tier_stats['count']:,}** jogadores{self._format_delta(deltas.get('tiers', {}).get(tier))}",
+                color=discord.Color.gold()
+            )
+            embed.add_field(
+                name="Posição no tier",
+                value="\n".join(f"Top {pos}: **{pts:,}** pts" for pos, pts in tier_stats['cutoffs'].items() if pts is not None),
+                inline=True
+            )
+            embed.add_field(
+                name="Entrada por subtier",
+                value="\n".join(f"{tier} {sub}: **{pts:,}** pts ({tier_stats['sub_tiers'].get(sub, 0)} jog.)" for sub, pts in tier_stats['sub_tier_entry'].items()),
+                inline=True
+            )
+            embed.add_field(
+                name="Faixa de pontos",
+                value=f"{tier_stats['min_points']:,} – {tier_stats['max_points']:,}",
+                inline=False
+            )
+        else:
+            embed = discord.Embed(
+                title="📊 Notas de Corte do Leaderboard",
+                description=f"**{stats['total_players']:,}** jogadores no leaderboard{self._format_delta(deltas.get('total_players'))}",
+                color=discord.Color.gold()
+            )
+            embed.add_field(
+                name="Posição geral",
+                value="\n".join(
+                    f"Top {pos}: **{pts:,}** pts{self._format_delta(deltas.get('cutoffs', {}).get(pos))}"
+                    for pos, pts in stats['cutoffs'].items() if pts is not None
+                ),
+                inline=True
+            )
+            embed.add_field(
+                name="Percentis",
+                value="\n".join(
+                    f"P{p}: **{pts:,}** pts{self._format_delta(deltas.get('percentiles', {}).get(p))}"
+                    for p, pts in stats['percentiles'].items() if pts is not None
+                ),
+                inline=True
+            )
+            embed.add_field(
+                name="Jogadores por tier",
+                value="\n".join(
+                    f"{tier}: **{tier_stats['count']:,}**{self._format_delta(deltas.get('tiers', {}).get(tier))}"
+                    for tier, tier_stats in stats['tiers'].items()
+                ),
+                inline=False
+            )
+
+        footer = f"Última atualização: {updated_at}"
+        if deltas:
+            footer += " • variações em relação à atualização anterior"
+        embed.set_footer(text=footer)
+        await interaction.response.send_message(embed=embed)
+
 async def setup(bot):
     await bot.add_cog(Leaderboard(bot))
\ No newline at end of file
@@ -0,0 +1,439 @@
+import discord
+from discord.ext import commands
+from discord import app_commands
+import aiohttp
+import os
+import asyncio
+import codecs
+import json
+import logging
+import math
+import zlib
+import io
+import itertools
+import weakref
+from collections import Counter, OrderedDict
+from typing import Optional, Dict, Any, List, AsyncIterator
+from PIL import Image, ImageDraw, ImageFont
+
+from defi.checks import is_rank_channel_check
+from defi.resilience import request_json, PubgApiError
+from defi.scheduler import get_key_scheduler
+from defi.http_pool import acquire_pubg_session, release_pubg_session
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+PUBG_API_BASE_URL = "https://api.pubg.com/shards/steam"
+
+# O comando já foi deferido, então a busca do jogador pode esperar mais na fila interativa
+INTERACTIVE_DEADLINE_SECONDS = 30
+
+# Tamanho dos pedaços lidos da rede e limite de um único evento ainda incompleto no buffer
+TELEMETRY_CHUNK_SIZE = 64 * 1024
+MAX_PENDING_EVENT_SIZE = 1024 * 1024
+
+# Relatórios prontos por (partida, jogador); o telemetry de uma partida nunca muda
+TELEMETRY_REPORT_CACHE_SIZE = 256
+telemetry_report_cache: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+# Uma leitura do telemetry por partida de cada vez; o lock some sozinho quando ninguém mais o segura
+_match_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+DAMAGE_EVENTS = {"LogPlayerTakeDamage"}
+KILL_EVENTS = {"LogPlayerKillV2"}
+KNOCK_EVENTS = {"LogPlayerMakeGroggy"}
+
+# damageReason -> parte do corpo exibida no relatório
+BODY_PARTS = {
+    "HeadShot": "Cabeça",
+    "TorsoShot": "Torso",
+    "ArmShot": "Braço",
+    "PelvisShot": "Pélvis",
+    "LegShot": "Perna",
+    "NonSpecific": "Corpo",
+}
+
+# Card do relatório, no layout do relatorio_telemetria.png
+REPORT_CARD_SIZE = (1536, 1024)
+REPORT_CARD_BACKGROUND_PATH = 'compare/relatorio.png'
+REPORT_CARD_FONT_PATH = 'fonts/pubgsans.ttf'
+REPORT_CARD_WHITE = (255, 255, 255)
+REPORT_CARD_ORANGE = (255, 165, 0)
+
+# Cores dos marcadores de parte do corpo, as mesmas do dano_*.png
+BODY_PART_COLORS = {
+    "Cabeça": (255, 0, 255),
+    "Torso": (110, 0, 220),
+    "Braço": (0, 255, 0),
+    "Pélvis": (0, 170, 255),
+    "Perna": (255, 220, 0),
+    "Corpo": (255, 0, 0),
+}
+
+
+class TelemetryEventParser:
+    def __init__(self):
+        """
+        Parser incremental do array JSON do telemetry. Recebe bytes já descomprimidos
+        aos pedaços e devolve cada evento assim que ele termina, mantendo no buffer
+        apenas o evento em andamento.
+        """
+        self._decoder = json.JSONDecoder()
+        self._text_decoder = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ""
+        self._started = False
+        self._finished = False
+
+    def feed(self, data: bytes, final: bool = False) -> List[Dict[str, Any]]:
+        self._buffer += self._text_decoder.decode(data, final=final)
+        events = []
+        buffer = self._buffer
+        index = 0
+        length = len(buffer)
+
+        while index < length and not self._finished:
+            char = buffer[index]
+            if char in ' \t\r\n,':
+                index += 1
+                continue
+            if not self._started:
+                if char != '[':
+                    raise ValueError(f"Telemetry não começa com um array JSON (encontrado {char!r}).")
+                self._started = True
+                index += 1
+                continue
+            if char == ']':
+                self._finished = True
+                index += 1
+                break
+            try:
+                event, index = self._decoder.raw_decode(buffer, index)
+            except json.JSONDecodeError:
+                # Evento cortado no meio do pedaço: espera o próximo
+                if final or length - index > MAX_PENDING_EVENT_SIZE:
+                    raise
+                break
+            events.append(event)
+
+        self._buffer = buffer[index:]
+        return events
+
+
+class DamageReport:
+    def __init__(self, player_name: str):
+        """Agregado de dano de um jogador numa partida; só contadores, nunca eventos."""
+        self.player_name = player_name
+        self.total_damage = 0.0
+        self.hits = 0
+        self.kills = 0
+        self.knocks = 0
+        self.by_weapon = Counter()
+        self.by_victim = Counter()
+        self.by_phase = Counter()
+        self.by_body_part = Counter()
+
+    @staticmethod
+    def phase_name(is_game) -> str:
+        """common.isGame: 0 antes do avião, 0.x até a primeira zona, depois 1, 1.5, 2..."""
+        if not is_game or is_game < 1:
+            return "Início"
+        return f"Zona {math.floor(is_game)}"
+
+    def add_damage(self, event: Dict[str, Any]):
+        damage = event.get("damage") or 0.0
+        if damage <= 0:
+            return
+        victim = (event.get("victim") or {}).get("name", "Desconhecido")
+        weapon = event.get("damageCauserName") or event.get("damageTypeCategory") or "Desconhecido"
+        weapon = weapon.removeprefix("Weap").removesuffix("_C")
+        self.total_damage += damage
+        self.hits += 1
+        self.by_weapon[weapon] += damage
+        self.by_victim[victim] += damage
+        self.by_phase[self.phase_name((event.get("common") or {}).get("isGame"))] += damage
+        self.by_body_part[BODY_PARTS.get(event.get("damageReason"), "Corpo")] += damage
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "player_name": self.player_name,
+            "total_damage": self.total_damage,
+            "hits": self.hits,
+            "kills": self.kills,
+            "knocks": self.knocks,
+            "by_weapon": dict(self.by_weapon.most_common()),
+            "by_victim": dict(self.by_victim.most_common()),
+            "by_phase": dict(self.by_phase),
+            "by_body_part": dict(self.by_body_part.most_common()),
+        }
+
+
+async def get_telemetry_url(session: aiohttp.ClientSession, headers: dict, match_id: str) -> Optional[str]:
+    """Busca na partida o asset de telemetry e retorna sua URL (/matches não conta no rate limit)."""
+    match_data = await request_json(session, f"{PUBG_API_BASE_URL}/matches/{match_id}", headers)
+    if not match_data:
+        return None
+    asset_ids = {asset.get("id") for asset in match_data.get("data", {}).get("relationships", {}).get("assets", {}).get("data", [])}
+    for item in match_data.get("included", []):
+        if item.get("type") == "asset" and (not asset_ids or item.get("id") in asset_ids):
+            return item.get("attributes", {}).get("URL")
+    return None
+
+
+async def iter_telemetry_events(session: aiohttp.ClientSession, telemetry_url: str) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Baixa o telemetry em pedaços, descomprimindo e decodificando conforme chega.
+    Se o servidor mandar o arquivo já com Content-Encoding o aiohttp descomprime;
+    se vier o .gz cru, o zlib descomprime aqui, pedaço a pedaço.
+    """
+    async with session.get(telemetry_url, headers={"Accept-Encoding": "gzip"}) as response:
+        if response.status != 200:
+            raise PubgApiError(f"Erro {response.status} ao baixar o telemetry.", status=response.status)
+
+        parser = TelemetryEventParser()
+        decompressor = None
+        first_chunk = True
+        async for chunk in response.content.iter_chunked(TELEMETRY_CHUNK_SIZE):
+            if first_chunk:
+                first_chunk = False
+                if chunk[:2] == b'\x1f\x8b':
+                    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            data = decompressor.decompress(chunk) if decompressor else chunk
+            for event in parser.feed(data):
+                yield event
+        tail = decompressor.flush() if decompressor else b''
+        for event in parser.feed(tail, final=True):
+            yield event
+
+
+async def build_damage_reports(session: aiohttp.ClientSession, telemetry_url: str, player_names: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Percorre o telemetry uma única vez e agrega dano por arma, vítima, fase e parte
+    do corpo para os jogadores pedidos. Eventos de outros jogadores são descartados
+    assim que decodificados.
+    """
+    reports = {name.lower(): DamageReport(name) for name in player_names}
+    relevant_events = DAMAGE_EVENTS | KILL_EVENTS | KNOCK_EVENTS
+
+    async for event in iter_telemetry_events(session, telemetry_url):
+        event_type = event.get("_T")
+        if event_type not in relevant_events:
+            continue
+
+        if event_type in KILL_EVENTS:
+            killer = (event.get("killer") or {}).get("name", "").lower()
+            if killer in reports:
+                reports[killer].kills += 1
+            continue
+
+        attacker = (event.get("attacker") or {}).get("name", "").lower()
+        report = reports.get(attacker)
+        if report is None:
+            continue
+        if event_type in KNOCK_EVENTS:
+            report.knocks += 1
+        elif (event.get("victim") or {}).get("name", "").lower() != attacker:
+            report.add_damage(event)
+
+    return {key: report.to_dict() for key, report in reports.items()}
+
+
+async def get_damage_reports(session: aiohttp.ClientSession, headers: dict, match_id: str, player_names: List[str]) -> Optional[Dict[str, Dict[str, Any]]]:
+    """
+    Relatórios de dano de uma partida, com cache por (partida, jogador). Jogadores
+    ainda sem relatório são agregados juntos numa única leitura do telemetry.
+    Retorna None se a partida não tiver telemetry.
+    """
+    lock = _match_locks.get(match_id)
+    if lock is None:
+        lock = _match_locks[match_id] = asyncio.Lock()
+    async with lock:
+        missing = [name for name in player_names if (match_id, name.lower()) not in telemetry_report_cache]
+        if missing:
+            telemetry_url = await get_telemetry_url(session, headers, match_id)
+            if not telemetry_url:
+                return None
+            logger.info(f"Processando telemetry da partida {match_id} para {missing}.")
+            reports = await build_damage_reports(session, telemetry_url, missing)
+            for key, report in reports.items():
+                telemetry_report_cache[(match_id, key)] = report
+                while len(telemetry_report_cache) > TELEMETRY_REPORT_CACHE_SIZE:
+                    telemetry_report_cache.popitem(last=False)
+
+    result = {}
+    for name in player_names:
+        report = telemetry_report_cache.get((match_id, name.lower()))
+        if report is not None:
+            telemetry_report_cache.move_to_end((match_id, name.lower()))
+            result[name.lower()] = report
+    return result
+
+
+def draw_report_card(player_name: str, match_id: str, report: Dict[str, Any]) -> io.BytesIO:
+    """
+    Desenha o card do relatório (armas mais usadas, estatísticas, vítimas, partes do
+    corpo e dano por fase) e devolve o PNG em memória. É CPU puro: chamar via
+    asyncio.to_thread para não travar o event loop.
+    """
+    width, height = REPORT_CARD_SIZE
+    if os.path.exists(REPORT_CARD_BACKGROUND_PATH):
+        img = Image.open(REPORT_CARD_BACKGROUND_PATH).convert("RGBA").resize(REPORT_CARD_SIZE)
+    else:
+        logger.warning(f"Fundo do relatório não encontrado em '{REPORT_CARD_BACKGROUND_PATH}', usando fundo liso.")
+        img = Image.new("RGBA", REPORT_CARD_SIZE, (14, 22, 28, 255))
+    draw = ImageDraw.Draw(img)
+
+    try:
+        font_title = ImageFont.truetype(REPORT_CARD_FONT_PATH, 70)
+        font_header = ImageFont.truetype(REPORT_CARD_FONT_PATH, 40)
+        font_text = ImageFont.truetype(REPORT_CARD_FONT_PATH, 32)
+        font_small = ImageFont.truetype(REPORT_CARD_FONT_PATH, 22)
+    except IOError:
+        logger.warning("Fonte não encontrada, usando a fonte padrão.")
+        font_title = font_header = font_text = font_small = ImageFont.load_default()
+
+    def centered(text: str, x: float, y: float, font, fill):
+        draw.text((x - draw.textlength(text, font=font) / 2, y), text, font=font, fill=fill)
+
+    centered("RELATÓRIO DE PARTIDA", width / 2, 40, font_title, REPORT_CARD_WHITE)
+    centered(f"JOGADOR: {player_name.upper()}", width / 2, 120, font_header, REPORT_CARD_ORANGE)
+
+    # Armas mais usadas: até três colunas centralizadas
+    centered("ARMAS MAIS USADAS", width / 2, 190, font_header, REPORT_CARD_WHITE)
+    weapons = list(report['by_weapon'].items())[:3]
+    for i, (weapon, damage) in enumerate(weapons):
+        x = width * (2 * i + 1) / (2 * len(weapons))
+        centered(weapon.upper(), x, 270, font_header, REPORT_CARD_ORANGE)
+        centered(f"DANO: {damage:.2f}", x, 320, font_header, REPORT_CARD_ORANGE)
+    if not weapons:
+        centered("NENHUM DANO CAUSADO", width / 2, 270, font_header, REPORT_CARD_ORANGE)
+
+    columns_y = 420
+    line_height = 45
+
+    # Estatísticas da partida
+    x = 70
+    draw.text((x, columns_y), "ESTATÍSTICAS DA PARTIDA", font=font_header, fill=REPORT_CARD_WHITE)
+    stats_lines = [
+        f"DANO TOTAL: {report['total_damage']:.2f}",
+        f"ACERTOS: {report['hits']}",
+        f"ELIMINAÇÕES (KILLS): {report['kills']}",
+        f"NOCAUTES: {report['knocks']}",
+    ]
+    for i, line in enumerate(stats_lines):
+        draw.text((x, columns_y + 70 + i * line_height), line, font=font_text, fill=REPORT_CARD_ORANGE)
+
+    # Vítimas com mais dano
+    x = 560
+    draw.text((x, columns_y), "VÍTIMAS", font=font_header, fill=REPORT_CARD_WHITE)
+    for i, (victim, damage) in enumerate(list(report['by_victim'].items())[:5]):
+        draw.text((x, columns_y + 70 + i * line_height), f"- {victim.upper()}: {damage:.0f}", font=font_text, fill=REPORT_CARD_ORANGE)
+
+    # Partes do corpo com o marcador colorido do dano_*.png
+    x = 1100
+    draw.text((x, columns_y), "PARTES DO CORPO", font=font_header, fill=REPORT_CARD_WHITE)
+    for i, (part, damage) in enumerate(list(report['by_body_part'].items())[:6]):
+        y = columns_y + 70 + i * line_height
+        draw.rectangle((x, y + 6, x + 22, y + 28), fill=BODY_PART_COLORS.get(part, REPORT_CARD_WHITE))
+        draw.text((x + 35, y), f"{part.upper()}: {damage:.0f} DANO", font=font_text, fill=REPORT_CARD_WHITE)
+
+    # Dano por fase, em linhas de até cinco fases
+    phases_y = 780
+    draw.text((70, phases_y), "DANO POR FASE", font=font_header, fill=REPORT_CARD_WHITE)
+    for i, (phase, damage) in enumerate(report['by_phase'].items()):
+        row, column = divmod(i, 5)
+        draw.text((70 + column * 280, phases_y + 70 + row * line_height), f"{phase.upper()}: {damage:.0f}", font=font_text, fill=REPORT_CARD_ORANGE)
+
+    footer = f"PARTIDA {match_id}"
+    draw.text((width - 30 - draw.textlength(footer, font=font_small), height - 45), footer, font=font_small, fill=REPORT_CARD_WHITE)
+
+    img_buffer = io.BytesIO()
+    img.save(img_buffer, format="PNG")
+    img_buffer.seek(0)
+    return img_buffer
+
+
+class PUBGTelemetry(commands.Cog):
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.http_session = None
+
+        api_keys = [value for key, value in os.environ.items() if key.startswith("PUBG_API_KEY") and value]
+        if api_keys:
+            self.api_key_iterator = itertools.cycle(api_keys)
+        else:
+            self.api_key_iterator = None
+            logger.error("Nenhuma chave de API do PUBG encontrada. O comando de relatório não funcionará.")
+
+    async def cog_load(self):
+        self.http_session = acquire_pubg_session(self.bot)
+
+    async def cog_unload(self):
+        await release_pubg_session(self.bot)
+
+    @app_commands.command(name='relatorio', description='Mostra o relatório de dano de um jogador numa partida recente de PUBG.')
+    @is_rank_channel_check
+    @app_commands.describe(
+        jogador="Nome do jogador PUBG",
+        partida="Qual partida recente analisar (1 = a mais recente, padrão: 1)"
+    )
+    async def relatorio(self, interaction: discord.Interaction, jogador: str, partida: Optional[int] = 1):
+        logger.info(f"Comando relatorio executado por {interaction.user} para '{jogador}' (partida {partida}).")
+
+        if not self.api_key_iterator:
+            await interaction.response.send_message("❌ Erro interno: Nenhuma chave da API do PUBG configurada.", ephemeral=True)
+            return
+
+        if partida <= 0 or partida > 10:
+            await interaction.response.send_message("❌ A partida deve ser entre 1 e 10.", ephemeral=True)
+            return
+
+        # Ler o telemetry leva alguns segundos
+        await interaction.response.defer()
+
+        session = self.http_session
+        api_key = next(self.api_key_iterator)
+        headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Accept": "application/vnd.api+json"
+        }
+        limiter = get_key_scheduler(self.bot, api_key).interactive(INTERACTIVE_DEADLINE_SECONDS)
+
+        try:
+            player_data = await request_json(session, f"{PUBG_API_BASE_URL}/players?filter[playerNames]={jogador}", headers, limiter=limiter)
+            if not player_data or not player_data.get("data"):
+                await interaction.followup.send(f"❌ Não foi possível encontrar o jogador **{jogador}**.", ephemeral=True)
+                return
+
+            player_name = player_data["data"][0].get("attributes", {}).get("name", jogador)
+            match_ids = [match.get("id") for match in player_data["data"][0].get("relationships", {}).get("matches", {}).get("data", []) if match.get("id")]
+            if len(match_ids) < partida:
+                await interaction.followup.send(f"❌ **{player_name}** não tem {partida} partidas recentes.", ephemeral=True)
+                return
+
+            match_id = match_ids[partida - 1]
+            reports = await get_damage_reports(session, headers, match_id, [player_name])
+        except (PubgApiError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error(f"Falha ao processar telemetry para '{jogador}': {e}")
+            await interaction.followup.send("❌ A API do PUBG está instável no momento. Tente novamente em alguns instantes.", ephemeral=True)
+            return
+        except ValueError as e:
+            logger.error(f"Telemetry inválido para '{jogador}': {e}", exc_info=True)
+            await interaction.followup.send("❌ O telemetry desta partida está em um formato inesperado.", ephemeral=True)
+            return
+
+        report = (reports or {}).get(player_name.lower())
+        if not report:
+            await interaction.followup.send("❌ Esta partida não possui telemetry disponível.", ephemeral=True)
+            return
+
+        try:
+            image_buffer = await asyncio.to_thread(draw_report_card, player_name, match_id, report)
+        except Exception as e:
+            logger.error(f"Erro ao desenhar o relatório de '{player_name}' na partida {match_id}: {e}", exc_info=True)
+            await interaction.followup.send("❌ Ocorreu um erro ao gerar a imagem do relatório.", ephemeral=True)
+            return
+        await interaction.followup.send(file=discord.File(image_buffer, filename=f"relatorio_{player_name}.png"))
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(PUBGTelemetry(bot))
+    logger.info("Cog 'PUBGTelemetry' carregada com sucesso.")